@@ -381,7 +381,7 @@ def initialize(experiment=None):
         experiment.set_log_level(defaults.event_logging)
 
     if misc.is_interactive_mode() and not defaults.window_mode \
-        and not hasattr(experiment, "testsuite"):
+        and not defaults.headless and not hasattr(experiment, "testsuite"):
         print("""
 Python is running in an interactive shell but Expyriment wants to initialize a
 fullscreen.""")
@@ -402,6 +402,8 @@ fullscreen.""")
     _keyboard.end_function = end
     _keyboard.pause_function = pause
 
+    if defaults.headless and "SDL_AUDIODRIVER" not in os.environ:
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
     mixer.pre_init(defaults.audiosystem_sample_rate,
                    defaults.audiosystem_bit_depth,
                    defaults.audiosystem_channels,
@@ -414,7 +416,8 @@ fullscreen.""")
     experiment._screen = Screen(colour=(0, 0, 0),
                                 open_gl=defaults.open_gl,
                                 window_mode=defaults.window_mode,
-                                window_size=defaults.window_size)
+                                window_size=defaults.window_size,
+                                headless=defaults.headless)
     # Hack for IDLE: quit pygame and call atexit functions when crashing
     if misc.is_idle_running() and sys.argv[0] != "":
         try:
@@ -28,7 +28,7 @@ from . import defaults, initialize, end
 from .. import stimuli, io, _internals, design
 import expyriment
 
-from ..misc import constants, statistics, list_fonts, unicode2byte
+from ..misc import constants, list_fonts, unicode2byte
 from ..misc._timer import get_time
 from ..design import randomize
 
@@ -141,15 +141,7 @@ After the test, you will be asked to indicate which (if any) of those two square
             exp.clock.wait(randomize.rand_int(30, 60))
 
         # determine refresh_rate
-        tmp = []
-        for _x in range(100):
-            start = get_time()
-            s1.present(clear=False)
-            tmp.append(get_time() - start)
-            start = get_time()
-            s2.present(clear=False)
-            tmp.append(get_time() - start)
-        refresh_rate = 1000 // (statistics.mean(tmp) * 1000)
+        refresh_rate = 1000 // exp.screen.measure_refresh_interval(200)
 
         #text = stimuli.TextScreen("Results", "[Press RETURN to continue]")
         #graph = _make_graph(todo_time, actual_time, [150, 150, 150])
@@ -43,6 +43,11 @@ Default settings for the control package. ::
     goodbye_text : str
         the text to be shown when ending an experiment
         
+    headless : bool
+        render into an offscreen software surface instead of opening a
+        display (e.g. on continuous integration or batch servers); OpenGL is
+        switched off and the size of the screen is window_size
+        
     initialize_delay : int
         a delay (in seconds) to wait before running an experiment to give
         Python time to start properly
@@ -169,6 +174,7 @@ refresh_key = None # TODO: not yet documented, because this feature is experimen
 open_gl = 2
 window_mode = False
 window_size = (800, 600)
+headless = False
 
 event_logging = 1  # 1 = default, 2 = extensive, 0 or False = off
 stdout_logging = True
@@ -16,6 +16,7 @@ from . import defaults
 from . import permute
 from . import randomize
 from ._structure import Experiment, Block, Trial
+from ._prefetcher import Prefetcher
 
 from .. import _internals
 _internals.active_exp = Experiment("None")
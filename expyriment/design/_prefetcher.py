@@ -0,0 +1,332 @@
+"""
+The design._prefetcher module of expyriment.
+
+This module contains a class implementing the preparation of the stimuli of
+upcoming trials.
+
+"""
+from __future__ import absolute_import, print_function, division
+from builtins import *
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import os
+import threading
+
+from . import defaults
+from .. import _internals
+from ..misc import Clock
+
+
+class Prefetcher(object):
+    """A class implementing a prefetcher for the stimuli of upcoming trials.
+
+    The stimuli of the next trials are prepared in small time slices via
+    `upload` (e.g. during inter-trial intervals): their surfaces are created
+    (i.e. text rendering, picture loading, drawing, scaling and rotating)
+    and they are preloaded (in OpenGL mode the texture upload). Since pygame
+    is not thread-safe, this is done in the main thread. While the current
+    trial runs, a worker thread only reads the files of the stimuli of the
+    next trials (e.g. pictures), so that loading them later does not wait
+    for the disk.
+
+    Example::
+
+        prefetcher = design.Prefetcher(block.trials, lookahead=3)
+        prefetcher.start()
+        for trial in block.trials:
+            prefetcher.preload(trial)
+            # ... present the trial ...
+            prefetcher.upload(max_time=5)
+            trial.unload_stimuli()
+        prefetcher.stop()
+
+    Notes
+    -----
+    Stimuli that are shared by several trials are prepared only once.
+    Stimuli that have been prepared for trials that are skipped are unloaded
+    again as soon as a later trial is preloaded.
+
+    """
+
+    _chunk_size = 1024 * 1024  # bytes read at once by the worker thread
+
+    def __init__(self, trials, lookahead=None, memory_budget=None):
+        """Create a prefetcher.
+
+        Parameters
+        ----------
+        trials : list of design.Trial
+            the trials in the order of presentation
+        lookahead : int, optional
+            number of upcoming trials to prepare
+        memory_budget : int, optional
+            maximal memory (in MB) of prepared surfaces of upcoming trials
+            ('None' is unlimited)
+
+        """
+
+        if lookahead is None:
+            lookahead = defaults.prefetcher_lookahead
+        if memory_budget is None:
+            memory_budget = defaults.prefetcher_memory_budget
+        self._trials = list(trials)
+        self._lookahead = lookahead
+        self._memory_budget = memory_budget
+        self._current = 0
+        self._prepared = {}  # id(stimulus): [stimulus, bytes of the surface]
+        self._read = set()  # files read by the worker
+        self._report = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    @property
+    def trials(self):
+        """Getter for trials."""
+
+        return self._trials
+
+    @property
+    def lookahead(self):
+        """Getter for lookahead."""
+
+        return self._lookahead
+
+    @property
+    def memory_budget(self):
+        """Getter for memory_budget."""
+
+        return self._memory_budget
+
+    @property
+    def is_running(self):
+        """Getter for is_running."""
+
+        return self._running
+
+    @property
+    def prepared_memory(self):
+        """Getter for prepared_memory.
+
+        The memory (in bytes) of surfaces that have been prepared for
+        upcoming trials.
+
+        """
+
+        return sum([x[1] for x in self._prepared.values()])
+
+    @property
+    def report(self):
+        """Getter for report.
+
+        A list of tuples (trial id, ready in time, number of stimuli
+        ready, number of stimuli) for every preloaded trial.
+
+        """
+
+        return list(self._report)
+
+    def start(self):
+        """Start the worker thread."""
+
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop the worker thread."""
+
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def preload(self, trial):
+        """Preload the stimuli of a trial.
+
+        This has to be called in the main thread. It records whether the
+        stimuli of the trial were prepared in time and moves the lookahead
+        window to the trials after this one.
+
+        Parameters
+        ----------
+        trial : design.Trial
+            the trial to preload
+
+        Returns
+        -------
+        ready : bool
+            True, if all stimuli had been prepared in time
+
+        """
+
+        try:
+            index = [id(x) for x in self._trials].index(id(trial))
+        except ValueError:
+            index = None
+        n_ready = 0
+        for stimulus in trial.stimuli:
+            if self._is_ready(stimulus):
+                n_ready += 1
+            self._preload(stimulus)
+            self._prepared.pop(id(stimulus), None)
+        ready = n_ready == len(trial.stimuli)
+        self._report.append((trial.id, ready, n_ready, len(trial.stimuli)))
+        if _internals.active_exp.is_initialized:
+            _internals.active_exp._event_file_log(
+                "Trial,prefetched,{0},ready={1}".format(trial.id, ready), 2)
+        if index is not None:
+            with self._condition:
+                self._current = index + 1
+                self._condition.notify_all()
+            self._evict()
+        return ready
+
+    def upload(self, max_time=None):
+        """Prepare and preload stimuli of upcoming trials.
+
+        This has to be called in the main thread (e.g. during an inter-trial
+        interval). Stimuli are prepared in the order of presentation until
+        the memory budget is exhausted.
+
+        Parameters
+        ----------
+        max_time : int, optional
+            maximal time (in ms) to spend ('None' is until all stimuli in
+            the lookahead window are prepared)
+
+        Returns
+        -------
+        n_preloaded : int
+            number of preloaded stimuli
+
+        """
+
+        start = Clock.monotonic_time()
+        budget = self._memory_budget
+        n_preloaded = 0
+        for stimulus in self._window_stimuli():
+            if max_time is not None and \
+                    (Clock.monotonic_time() - start) * 1000 >= max_time:
+                break
+            if budget is not None and \
+                    self.prepared_memory >= budget * 1024 * 1024:
+                break
+            if id(stimulus) in self._prepared or \
+                    getattr(stimulus, "is_preloaded", True):
+                continue
+            self._preload(stimulus)
+            self._prepared[id(stimulus)] = [stimulus,
+                                            self._memory_usage(stimulus)]
+            n_preloaded += 1
+        return n_preloaded
+
+    def _window_stimuli(self):
+        """Return the stimuli of the trials in the lookahead window."""
+
+        with self._condition:
+            end = min(self._current + self._lookahead, len(self._trials))
+            trials = self._trials[self._current:end]
+        stimuli = []
+        for trial in trials:
+            stimuli.extend(trial.stimuli)
+        return stimuli
+
+    def _evict(self):
+        """Unload the stimuli prepared for trials that have passed."""
+
+        window = set([id(x) for x in self._window_stimuli()])
+        for key in list(self._prepared.keys()):
+            if key not in window:
+                stimulus = self._prepared.pop(key)[0]
+                if hasattr(stimulus, "unload"):
+                    stimulus.unload()
+
+    @staticmethod
+    def _is_ready(stimulus):
+        """Check if a stimulus does not need to be created anymore."""
+
+        if getattr(stimulus, "is_preloaded", False):
+            return True
+        return getattr(stimulus, "has_surface", True)
+
+    @staticmethod
+    def _preload(stimulus):
+        """Preload a stimulus (main thread only)."""
+
+        if hasattr(stimulus, "preload") and not stimulus.is_preloaded:
+            stimulus.preload()
+
+    @staticmethod
+    def _memory_usage(stimulus):
+        """Return the memory (in bytes) held by a prepared stimulus.
+
+        This is the size of its surface, its OpenGL texture and its
+        compressed data (in OpenGL mode, preloaded stimuli are compressed
+        and have no surface).
+
+        """
+
+        nbytes = 0
+        surface = getattr(stimulus, "_surface", None)
+        if surface is not None:
+            nbytes += surface.get_height() * surface.get_pitch()
+        ogl_screen = getattr(stimulus, "_ogl_screen", None)
+        if ogl_screen is not None:
+            width, height = ogl_screen._winsize
+            nbytes += width * height * 4
+        handle = getattr(stimulus, "_compression_handle", None)
+        if handle is not None:
+            nbytes += handle[1]
+        return nbytes
+
+    def _next_file(self):
+        """Return the next file to read or None."""
+
+        end = min(self._current + self._lookahead, len(self._trials))
+        for trial in self._trials[self._current:end]:
+            for stimulus in trial.stimuli:
+                filename = getattr(stimulus, "filename", None)
+                if filename is not None and filename not in self._read:
+                    return filename
+        return None
+
+    def _run(self):
+        """Read the files of the stimuli in the lookahead window.
+
+        This runs in the worker thread and does not touch pygame: reading
+        the files ahead only makes sure that the operating system has them
+        in its file cache when their stimuli are prepared.
+
+        """
+
+        while True:
+            with self._condition:
+                filename = None
+                while self._running:
+                    filename = self._next_file()
+                    if filename is not None:
+                        break
+                    self._condition.wait()
+                if not self._running:
+                    return
+                self._read.add(filename)
+            try:
+                if os.path.isfile(filename):
+                    with open(filename, 'rb') as f:
+                        while self._running and \
+                                len(f.read(self._chunk_size)) > 0:
+                            pass
+            except (IOError, OSError):
+                pass
@@ -35,3 +35,7 @@ max_shuffle_time = 5000
 
 # trial_list
 trial_list_directory = 'trials'
+
+# Prefetcher
+prefetcher_lookahead = 3
+prefetcher_memory_budget = 256  # in MB; 'None' is unlimited
@@ -12,13 +12,20 @@ __revision__ = ''
 __date__ = ''
 
 
+import os
+from collections import deque
+
 import pygame
 try:
     import OpenGL.GL as ogl
+    import OpenGL.GLU as oglu
 except ImportError:
     ogl = None
+    oglu = None
 
+from . import defaults
 from .. import _internals
+from ..misc._timer import get_time
 from ._input_output import Output
 
 
@@ -34,7 +41,8 @@ class Screen(Output):
 
     """
 
-    def __init__(self, colour, open_gl, window_mode, window_size):
+    def __init__(self, colour, open_gl, window_mode, window_size,
+                 headless=False):
         """Create and set up a screen output.
 
         Notes
@@ -55,6 +63,10 @@ class Screen(Output):
         window_size : (int, int)
             size of the window in window_mode,
             full screen mode if size of window_mode[0]<=0
+        headless : bool, optional
+            if True, render into an offscreen software surface of size
+            window_size (SDL dummy video driver) without opening a display;
+            OpenGL will be deactivated (default = False)
 
         """
 
@@ -67,16 +79,43 @@ class Screen(Output):
         self._open_gl = open_gl
         self._fullscreen = not window_mode
         self._window_size = window_size
-
-        if ogl is None:
+        self._headless = headless
+        self._flip_history = deque(maxlen=defaults.screen_flip_history_size)
+        self._last_flip = None
+        self._refresh_interval = None
+        self._n_dropped_frames = 0
+        self._detect_dropped_frames = defaults.screen_detect_dropped_frames
+        self._presented_stimulus = None
+        self._dirty_rectangles = defaults.screen_dirty_rectangles
+        self._full_update = True
+        self._frame_rects = None  # drawn regions since the last clear
+        self._changed_rects = []  # changed regions since the last update
+        self._cleared_colour = None
+
+        if ogl is None and self._open_gl:
             warn_message = "PyOpenGL is not installed. \
 OpenGL will be deactivated!"
             print("Warning: " + warn_message)
             _internals.active_exp._event_file_warn("Screen,warning," + warn_message)
             self._open_gl = False
 
+        if self._headless:
+            if self._open_gl:
+                warn_message = "OpenGL is not available in headless mode. \
+OpenGL will be deactivated!"
+                _internals.active_exp._event_file_warn(
+                    "Screen,warning," + warn_message)
+                self._open_gl = False
+            self._fullscreen = False
+            if pygame.display.get_init() and \
+                    pygame.display.get_driver() != "dummy":
+                pygame.display.quit()
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+
         pygame.display.init()
-        if _internals.active_exp.is_initialized:
+        if self._headless:
+            self._monitor_resolution = tuple(window_size)
+        elif _internals.active_exp.is_initialized:
             self._monitor_resolution = \
                         _internals.active_exp.screen.monitor_resolution
         else:
@@ -108,6 +147,10 @@ OpenGL will be deactivated!"
                     self._window_size,
                     pygame.DOUBLEBUF | pygame.OPENGL)
                 pygame.display.set_caption('Expyriment')
+            # Textures of a previous OpenGL context are invalid now
+            from ..stimuli import _visual
+            _visual._texture_cache.clear()
+            self._ogl_unprojection = self._get_ogl_unprojection()
 
             ogl_version = ogl.glGetString(ogl.GL_VERSION)
             if float(ogl_version[0:3]) < 2.0:
@@ -120,6 +163,29 @@ machine!")
         pygame.event.set_blocked(pygame.MOUSEBUTTONDOWN)
         pygame.event.set_blocked(pygame.MOUSEBUTTONUP)
 
+    @staticmethod
+    def _get_ogl_unprojection():
+        """Return the mapping of window coordinates to model coordinates.
+
+        The projection is a fixed (orthographic) mapping. It is therefore
+        unprojected only once and stimuli can be placed by pure arithmetic.
+
+        Returns
+        -------
+        unprojection : ((float, float, float), (float, float, float),
+                        (float, float, float))
+            model coordinates of the window origin and model space vectors
+            of one pixel along x and y
+
+        """
+
+        origin = oglu.gluUnProject(0, 0, 0)
+        x_axis = oglu.gluUnProject(1, 0, 0)
+        y_axis = oglu.gluUnProject(0, 1, 0)
+        return (tuple(origin),
+                tuple(x - o for x, o in zip(x_axis, origin)),
+                tuple(y - o for y, o in zip(y_axis, origin)))
+
     @property
     def colour(self):
         """Getter for colour."""
@@ -142,6 +208,12 @@ machine!")
 
         return self._open_gl
 
+    @property
+    def headless(self):
+        """Getter for headless."""
+
+        return self._headless
+
     @property
     def window_mode(self):
         """Getter for window_mode."""
@@ -160,15 +232,135 @@ machine!")
 
         return self._monitor_resolution
 
+    @property
+    def refresh_interval(self):
+        """Getter for the estimated refresh interval in ms (or None).
+
+        The refresh interval is estimated online from the intervals between
+        consecutive updates.
+
+        """
+
+        return self._refresh_interval
+
+    @property
+    def flip_history(self):
+        """Getter for flip_history.
+
+        A list of the last updates as tuples (time, interval, dropped frames,
+        stimulus id). The time of the update is the time (in ms) after the
+        buffer swap with respect to the experiment clock.
+
+        """
+
+        return list(self._flip_history)
+
+    @property
+    def n_dropped_frames(self):
+        """Getter for the number of dropped frames since the last reset."""
+
+        return self._n_dropped_frames
+
+    @property
+    def detect_dropped_frames(self):
+        """Getter for detect_dropped_frames."""
+
+        return self._detect_dropped_frames
+
+    @detect_dropped_frames.setter
+    def detect_dropped_frames(self, value):
+        """Setter for detect_dropped_frames.
+
+        Switch this on while presenting stimuli frame by frame (e.g.
+        animations). Each update that follows the previous one by more than
+        1.5 refresh intervals is then counted as dropped frame(s) and logged.
+
+        """
+
+        self._detect_dropped_frames = value
+        self._last_flip = None
+
+    @property
+    def dirty_rectangles(self):
+        """Getter for dirty_rectangles."""
+
+        return self._dirty_rectangles
+
+    @dirty_rectangles.setter
+    def dirty_rectangles(self, value):
+        """Setter for dirty_rectangles.
+
+        If switched on (non-OpenGL screens only), the screen keeps track of
+        the regions that have been drawn to since the last update and only
+        pushes those regions to the display. Clearing the screen then only
+        erases the regions that have been drawn to since the last clear.
+
+        Notes
+        -----
+        Stimuli register the regions they draw to automatically. When drawing
+        directly on the screen surface, the changed region has to be
+        registered via `mark_dirty`.
+
+        """
+
+        self._dirty_rectangles = value
+        self.mark_dirty()
+
+    def mark_dirty(self, rect=None):
+        """Register a changed region of the screen.
+
+        This is only relevant if dirty_rectangles is switched on.
+
+        Parameters
+        ----------
+        rect : pygame.Rect, optional
+            the changed region in surface coordinates ('None' is the whole
+            screen)
+
+        """
+
+        if rect is None:
+            self._full_update = True
+            self._frame_rects = None
+            self._changed_rects = []
+            return
+        if not self._dirty_rectangles or self._open_gl:
+            return
+        rect = pygame.Rect(rect).clip(self._surface.get_rect())
+        if rect.width > 0 and rect.height > 0:
+            if not self._full_update:
+                self._changed_rects.append(rect)
+            if self._frame_rects is not None:
+                self._frame_rects.append(rect)
+
+    def clear_flip_history(self):
+        """Clear the flip history and reset the dropped frames counter."""
+
+        self._flip_history.clear()
+        self._n_dropped_frames = 0
+        self._last_flip = None
+
     def update(self):
         """Update the screen.
 
         This will flip the display double buffer.
 
+        Returns
+        -------
+        time : float
+            time (in ms with respect to the experiment clock) after the
+            buffer swap
+
         """
 
         pygame.event.pump()
-        pygame.display.flip()
+        if self._dirty_rectangles and not self._open_gl and \
+                not self._full_update:
+            self._update_dirty_rects()
+        else:
+            pygame.display.flip()
+            self._full_update = False
+            self._changed_rects = []
         if self._open_gl >= 2:
             if self._open_gl == 3:
                 ogl.glBegin(ogl.GL_POINTS)
@@ -176,8 +368,182 @@ machine!")
                 ogl.glVertex2i(0, 0)
                 ogl.glEnd()
             ogl.glFinish()
+        flip_time = self._get_time()
+        self._register_flip(flip_time)
         if self._logging:
             _internals.active_exp._event_file_log("Screen,updated", 2)
+        return flip_time
+
+    def _update_dirty_rects(self):
+        """Push the changed regions of the screen to the display."""
+
+        rects = self._changed_rects
+        self._changed_rects = []
+        if len(rects) == 0:
+            return
+        area = sum(r.width * r.height for r in rects)
+        if area > 0.5 * self._window_size[0] * self._window_size[1]:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+    def update_at(self, time):
+        """Update the screen at a certain time.
+
+        The back buffer should be drawn before calling this method. The
+        method waits until shortly before the target time and then flips the
+        display double buffer. With a synchronized (OpenGL) screen, the flip
+        is issued half a refresh interval before the target time, such that
+        the buffer swap happens at the vertical retrace closest to the target
+        time.
+
+        Parameters
+        ----------
+        time : float
+            target time (in ms with respect to the experiment clock)
+
+        Returns
+        -------
+        onset : float
+            measured time (in ms with respect to the experiment clock) after
+            the buffer swap
+
+        See Also
+        --------
+        measure_refresh_interval, flip_at
+
+        """
+
+        if self._open_gl and self._refresh_interval is not None:
+            flip_time = time - self._refresh_interval / 2.0
+        else:
+            flip_time = time
+        while self._get_time() < flip_time:
+            if flip_time - self._get_time() > 2:
+                pygame.event.pump()
+        onset = self.update()
+        if self._logging:
+            _internals.active_exp._event_file_log(
+                "Screen,scheduled update,{0},{1}".format(
+                    int(round(time)), round(onset - time, 2)), 2)
+        return onset
+
+    def flip_at(self, frame_index):
+        """Update the screen a certain number of frames after the last update.
+
+        Requires an estimate of the refresh interval (see
+        `measure_refresh_interval`).
+
+        Parameters
+        ----------
+        frame_index : int
+            number of refresh intervals after the last update
+            (1 = next refresh)
+
+        Returns
+        -------
+        onset : float
+            measured time (in ms with respect to the experiment clock) after
+            the buffer swap
+
+        """
+
+        if self._refresh_interval is None:
+            raise RuntimeError("Refresh interval is unknown! \
+Please use Screen.measure_refresh_interval() first.")
+        if self._last_flip is None:
+            return self.update()
+        return self.update_at(self._last_flip +
+                              frame_index * self._refresh_interval)
+
+    def measure_refresh_interval(self, n_frames=100):
+        """Measure the refresh interval of the screen.
+
+        The screen is updated repeatedly (without changing its content) and
+        the mean interval between consecutive updates is taken as the
+        estimate of the refresh interval. This is only meaningful for
+        synchronized (OpenGL) screens; on other screens the estimate is
+        returned, but not used (e.g. by flip_at), and a warning is logged.
+
+        Parameters
+        ----------
+        n_frames : int, optional
+            number of updates (default = 100)
+
+        Returns
+        -------
+        refresh_interval : float
+            estimated refresh interval in ms
+
+        """
+
+        if n_frames < 1:
+            raise ValueError("n_frames has to be at least 1!")
+        logging = self._logging
+        self._logging = False
+        start = self.update()
+        for _x in range(n_frames):
+            end = self.update()
+        self._logging = logging
+        refresh_interval = (end - start) / float(n_frames)
+        if self._open_gl:
+            self._refresh_interval = refresh_interval
+        else:
+            warn_message = "The refresh interval can only be measured " + \
+                           "for OpenGL screens. It will not be used."
+            print("Warning: " + warn_message)
+            if _internals.active_exp.is_initialized:
+                _internals.active_exp._event_file_warn(
+                    "Screen,warning," + warn_message)
+        return refresh_interval
+
+    @staticmethod
+    def _get_time():
+        """Return the time (in ms with respect to the experiment clock)."""
+
+        time = get_time() * 1000
+        if _internals.active_exp.is_initialized:
+            time -= _internals.active_exp.clock.init_time
+        return time
+
+    def _register_flip(self, flip_time):
+        """Add a flip to the flip history and check for dropped frames.
+
+        Parameters
+        ----------
+        flip_time : float
+            time of the flip in ms
+
+        """
+
+        stimulus_id = self._presented_stimulus
+        self._presented_stimulus = None
+        interval = None
+        dropped = 0
+        if self._last_flip is not None:
+            interval = flip_time - self._last_flip
+            nominal = self._refresh_interval
+            # Only updates of frame-locked (blocking OpenGL) screens are
+            # spaced by the refresh interval; elsewhere they are just the
+            # gaps between presentations and are not learned from.
+            frame_locked = self._open_gl >= 2
+            if nominal is None or 0 < interval <= 0.5 * nominal:
+                if frame_locked and 2 < interval < 100:  # 10 to 500 Hz
+                    self._refresh_interval = interval
+            elif 0.5 * nominal < interval < 1.5 * nominal:
+                if frame_locked:
+                    self._refresh_interval = nominal + \
+                                             0.05 * (interval - nominal)
+            elif interval >= 1.5 * nominal and self._detect_dropped_frames:
+                dropped = int(round(interval / nominal)) - 1
+                self._n_dropped_frames += dropped
+                if self._logging:
+                    _internals.active_exp._event_file_warn(
+                        "Screen,warning,{0} frame(s) dropped,{1}".format(
+                            dropped, stimulus_id))
+        self._last_flip = flip_time
+        self._flip_history.append((flip_time, interval, dropped,
+                                   stimulus_id))
 
     def update_stimuli(self, stimuli):
         """Update only some stimuli on the screen.
@@ -264,14 +630,29 @@ machine!")
                              float(self._colour[1]) / 255,
                              float(self._colour[2]) / 255, 0)
             ogl.glClear(ogl.GL_COLOR_BUFFER_BIT | ogl.GL_DEPTH_BUFFER_BIT)
+        elif self._dirty_rectangles and self._frame_rects is not None and \
+                self._cleared_colour == self._colour:
+            # only erase what has been drawn since the last clear
+            for rect in self._frame_rects:
+                self._surface.fill(self._colour, rect)
+            if not self._full_update:
+                self._changed_rects.extend(self._frame_rects)
+            self._frame_rects = []
         else:
             self._surface.fill(self._colour)
+            self._cleared_colour = self._colour
+            self._frame_rects = []
+            self._full_update = True
+            self._changed_rects = []
         if self._logging:
             _internals.active_exp._event_file_log("Screen,cleared", 2)
 
     def save(self, filename):
         """Save the content of the screen as a picture.
 
+        In OpenGL mode, the content of the back buffer (i.e. the frame that
+        will be shown with the next update) is saved.
+
         Parameters
         ----------
         filename : str
@@ -280,4 +661,27 @@ machine!")
 
         """
 
-        pygame.image.save(self._surface, filename)
+        pygame.image.save(self.get_frame(), filename)
+
+    def get_frame(self):
+        """Return the content of the screen.
+
+        In OpenGL mode, the content of the back buffer (i.e. the frame that
+        will be shown with the next update) is read back.
+
+        Returns
+        -------
+        frame : pygame.Surface
+            a copy of the content of the screen
+
+        """
+
+        if not self._open_gl:
+            return self._surface.copy()
+        width, height = self._window_size
+        ogl.glPixelStorei(ogl.GL_PACK_ALIGNMENT, 1)
+        ogl.glReadBuffer(ogl.GL_BACK)
+        data = ogl.glReadPixels(0, 0, width, height, ogl.GL_RGB,
+                                ogl.GL_UNSIGNED_BYTE)
+        return pygame.image.fromstring(bytes(data), (width, height), "RGB",
+                                       True)
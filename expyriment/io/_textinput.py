@@ -32,6 +32,7 @@ except ImportError:
 
 from . import defaults
 from .. import _internals, stimuli
+from ..stimuli._font_cache import get_font_cache
 from ..misc import find_font, unicode2byte, constants, \
                  numpad_digit_code2ascii
 from .._internals import CallbackQuitEvent
@@ -130,10 +131,7 @@ class TextInput(Input):
             self._message_font = find_font(message_font)
         else:
             self._message_font = find_font(_internals.active_exp.text_font)
-        try:
-            with open(self._message_font, 'rb') as f:
-                pygame.font.Font(f, 10)
-        except:
+        if not get_font_cache().validate(self._message_font):
             raise IOError("Font '{0}' not found!".format(message_font))
         if message_bold is not None:
             self._message_bold = message_bold
@@ -160,10 +158,7 @@ class TextInput(Input):
             self._user_text_font = find_font(user_text_font)
         else:
             self._user_text_font = find_font(_internals.active_exp.text_font)
-        try:
-            with open(self._user_text_font, 'rb') as f:
-                pygame.font.Font(f, 10)
-        except:
+        if not get_font_cache().validate(self._user_text_font):
             raise IOError("Font '{0}' not found!".format(user_text_font))
         if user_text_colour is None:
             user_text_colour = defaults.textinput_user_text_colour
@@ -16,6 +16,11 @@ __date__ = ''
 
 from ..misc import constants as _constants
 
+# Screen
+screen_flip_history_size = 1000  # number of flips kept in the ring buffer
+screen_detect_dropped_frames = False
+screen_dirty_rectangles = False  # partial updates (non-OpenGL only)
+
 # Keyboard
 keyboard_default_keys = None
 
@@ -18,12 +18,13 @@ __date__ = ''
 import os
 import sys
 import glob
+import json
 import random
 import colorsys
 
 import pygame
 
-from .._internals import PYTHON3, android
+from .._internals import PYTHON3, android, get_settings_folder
 
 try:
     from locale import getdefaultlocale
@@ -170,20 +171,87 @@ def numpad_digit_code2ascii(keycode):
     else:
         return keycode
 
-def add_fonts(folder):
-    """Add fonts to Expyriment.
+_font_index_filename = "font_index.json"
+_found_fonts = {}  # memoized results of find_font
+_listed_fonts = None  # memoized result of list_fonts
+
+
+def _get_font_directories():
+    """Return the directories in which the system fonts are installed."""
+
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        directories = [os.path.join(os.environ.get("WINDIR", "C:\\Windows"),
+                                    "Fonts")]
+        if os.environ.get("LOCALAPPDATA") is not None:
+            directories.append(os.path.join(os.environ["LOCALAPPDATA"],
+                                            "Microsoft", "Windows", "Fonts"))
+    elif sys.platform == "darwin":
+        directories = ["/Library/Fonts", "/System/Library/Fonts",
+                       "/Network/Library/Fonts",
+                       os.path.join(home, "Library", "Fonts")]
+    else:
+        data_home = os.environ.get("XDG_DATA_HOME",
+                                   os.path.join(home, ".local", "share"))
+        directories = ["/usr/share/fonts", "/usr/local/share/fonts",
+                       "/usr/X11R6/lib/X11/fonts",
+                       os.path.join(home, ".fonts"),
+                       os.path.join(data_home, "fonts")]
+    return directories
 
-    All truetype fonts found in the given folder will be added to
-    Expyriment, such that they are found when only giving their name
-    (i.e. without the full path).
 
-    Parameters
-    ----------
-    folder : str or unicode
-        the full path to the folder to search for
+def _get_font_directories_state():
+    """Return the modification times of all font directories.
+
+    Subdirectories are included, since fonts are often installed in
+    subdirectories (e.g. /usr/share/fonts/truetype/dejavu).
 
     """
 
+    state = {}
+    for directory in _get_font_directories():
+        for root, _dirs, _files in os.walk(directory):
+            try:
+                state[root] = os.path.getmtime(root)
+            except OSError:
+                pass
+    return state
+
+
+def _init_system_fonts():
+    """Initialize the system fonts of pygame.
+
+    Locating the system fonts (e.g. with fc-list) can take a long time. The
+    located fonts are therefore stored in a font index in the Expyriment
+    settings folder (if it exists) together with the modification times of
+    the font directories. The index is used as long as these modification
+    times do not change.
+
+    """
+
+    if getattr(pygame.sysfont, "is_init", False):
+        return
+    pygame.font.init()
+
+    folder = get_settings_folder()
+    if folder is not None:
+        index_file = os.path.join(folder, _font_index_filename)
+        state = _get_font_directories_state()
+        try:
+            with open(index_file) as f:
+                index = json.load(f)
+            if index["pygame"] == pygame.version.ver and \
+                    index["directories"] == state:
+                for name, styles in index["fonts"].items():
+                    for bold, italic, font in styles:
+                        pygame.sysfont._addfont(name, bold, italic, font,
+                                                pygame.sysfont.Sysfonts)
+                pygame.sysfont.create_aliases()
+                pygame.sysfont.is_init = True
+                return
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            pass
+
     # If font cache has to be (re-)created, initializing system fonts can take
     # a while. By having a watchdog thread, we can check if this is the case
     # and notify the user accordingly.
@@ -197,13 +265,45 @@ def add_fonts(folder):
             m = "Initializing system fonts. This might take a couple of minutes..."
             sys.stdout.write(m + '\n')
 
-    state = {'completed': False}
-    watchdog = threading.Thread(target=watchdog_timer, args=(state,))
+    watchdog_state = {'completed': False}
+    watchdog = threading.Thread(target=watchdog_timer, args=(watchdog_state,))
     watchdog.daemon = True
     watchdog.start()
-    pygame.font.init()
     pygame.sysfont.initsysfonts()
-    state['completed'] = True
+    watchdog_state['completed'] = True
+
+    if folder is not None:
+        fonts = {}
+        for name, styles in pygame.sysfont.Sysfonts.items():
+            fonts[name] = [[bold, italic, font] for (bold, italic), font
+                           in styles.items()]
+        index = {"pygame": pygame.version.ver, "directories": state,
+                 "fonts": fonts}
+        try:
+            with open(index_file, 'w') as f:
+                json.dump(index, f)
+        except (IOError, OSError, TypeError, ValueError):
+            pass
+
+
+def add_fonts(folder):
+    """Add fonts to Expyriment.
+
+    All truetype fonts found in the given folder will be added to
+    Expyriment, such that they are found when only giving their name
+    (i.e. without the full path).
+
+    Parameters
+    ----------
+    folder : str or unicode
+        the full path to the folder to search for
+
+    """
+
+    global _listed_fonts
+    _init_system_fonts()
+    _found_fonts.clear()
+    _listed_fonts = None
 
     for font in glob.glob(os.path.join(folder, "*")):
         if font[-4:].lower() in ['.ttf', '.ttc']:
@@ -234,13 +334,13 @@ def list_fonts():
 
     """
 
-    pygame.font.init()
-
-    d = {}
-    fonts = pygame.font.get_fonts()
-    for font in fonts:
-        d[font] = pygame.font.match_font(font)
-    return d
+    global _listed_fonts
+    if _listed_fonts is None:
+        _init_system_fonts()
+        _listed_fonts = {}
+        for font in pygame.font.get_fonts():
+            _listed_fonts[font] = pygame.font.match_font(font)
+    return dict(_listed_fonts)
 
 
 def find_font(font):
@@ -260,17 +360,24 @@ def find_font(font):
         the font that is most similar
         If no font is found, an empty string will be returned.
 
-    """
+    Notes
+    -----
+    The results are memoized (until fonts are added with add_fonts).
 
-    pygame.font.init()
+    """
 
     if os.path.isfile(font):
         return font
+    try:
+        return _found_fonts[font]
+    except KeyError:
+        pass
+    _init_system_fonts()
     font_file = pygame.font.match_font(font)
-    if font_file is not None:
-        return font_file
-    else:
-        return ""
+    if font_file is None:
+        font_file = ""
+    _found_fonts[font] = font_file
+    return font_file
 
 
 def get_monitor_resolution():
@@ -14,6 +14,12 @@ __revision__ = ''
 __date__ = ''
 
 import math as _math
+import random as _random
+try:
+    import numpy as _np
+except:
+    _np = None
+
 from .. import _internals
 
 
@@ -157,6 +163,424 @@ def lines_intersect(pa, pb, pc, pd):
 
     return ccw(pa, pc, pd) != ccw(pb, pc, pd) and ccw(pa, pb, pc) != ccw(pa, pb, pd)
 
+def _as_xy_array(points):
+    """Return points (XYPoints or (x, y)) as float array with shape (n, 2)."""
+
+    if isinstance(points, _np.ndarray):
+        return points.astype(float, copy=False).reshape(-1, 2)
+    return _np.array([p.tuple if isinstance(p, XYPoint) else p
+                      for p in points], dtype=float).reshape(-1, 2)
+
+def _as_xy_list(points):
+    """Return points (XYPoints or (x, y)) as list of XYPoints."""
+
+    return [p if isinstance(p, XYPoint) else XYPoint(xy=p) for p in points]
+
+def _points_in_polygon_kernel(points, polygon):
+    """Ray casting for arrays of points (n, 2) and polygon vertices (m, 2)."""
+
+    x = points[:, 0, None]
+    y = points[:, 1, None]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = _np.roll(polygon[:, 0], -1), _np.roll(polygon[:, 1], -1)
+    with _np.errstate(divide="ignore", invalid="ignore"):
+        xinters = (y - y1) * (x2 - x1) / (y2 - y1) + x1
+    crossing = (y > _np.minimum(y1, y2)) & (y <= _np.maximum(y1, y2)) & \
+               (x <= _np.maximum(x1, x2)) & ((x1 == x2) | (x <= xinters))
+    return _np.count_nonzero(crossing, axis=1) % 2 == 1
+
+def _ccw(ax, ay, bx, by, cx, cy):
+    return (cy - ay) * (bx - ax) > (by - ay) * (cx - ax)
+
+def _edges(polygon):
+    """Return the edges (n, 4) of a polygon array (n, 2)."""
+
+    return _np.hstack((polygon, _np.roll(polygon, -1, axis=0)))
+
+def points_in_polygon(points, polygon):
+    """Return for each point whether it is inside a polygon.
+
+    Points outside the bounding box of the polygon are rejected without
+    further tests. If NumPy is installed, the remaining points are tested
+    in one vectorised pass.
+
+    Parameters
+    ----------
+    points : list of misc.XYPoint or (numeric, numeric)
+        the points to test
+    polygon : list of misc.XYPoint or (numeric, numeric)
+        point list defining the polygon
+
+    Returns
+    -------
+    check : list of bool
+        True for each point inside the polygon
+
+    """
+
+    if len(points) == 0:
+        return []
+    if _np is None:
+        polygon = _as_xy_list(polygon)
+        return [p.is_inside_polygon(polygon) for p in _as_xy_list(points)]
+
+    return _points_in_polygon_array(_as_xy_array(points),
+                                    _as_xy_array(polygon)).tolist()
+
+def _points_in_polygon_array(points, polygon):
+    """Bounding box rejection and ray casting of point array (n, 2)."""
+
+    inside = _np.zeros(len(points), dtype=bool)
+    if len(polygon) == 0:
+        return inside
+    candidates = _np.all((points >= polygon.min(axis=0)) &
+                         (points <= polygon.max(axis=0)), axis=1)
+    if _np.any(candidates):
+        inside[candidates] = _points_in_polygon_kernel(points[candidates],
+                                                       polygon)
+    return inside
+
+def points_in_polygons(points, polygons):
+    """Return for each point and each polygon whether the point is inside.
+
+    This is, for instance, useful to test all samples of a mouse trajectory
+    against several areas of interest at once.
+
+    Parameters
+    ----------
+    points : list of misc.XYPoint or (numeric, numeric)
+        the points to test
+    polygons : list of lists of misc.XYPoint or (numeric, numeric)
+        the point lists defining the polygons
+
+    Returns
+    -------
+    check : list of lists of bool
+        check[i][j] is True if point i is inside polygon j
+
+    """
+
+    if _np is None:
+        columns = [points_in_polygon(points, polygon) for polygon in polygons]
+        return [list(row) for row in zip(*columns)] if len(columns) > 0 \
+               else [[] for _p in points]
+
+    points = _as_xy_array(points)
+    check = _np.zeros((len(points), len(polygons)), dtype=bool)
+    for j, polygon in enumerate(polygons):
+        check[:, j] = _points_in_polygon_array(points, _as_xy_array(polygon))
+    return check.tolist()
+
+def segments_intersect(segments_a, segments_b):
+    """Return for each pair of line segments whether they are intersecting.
+
+    Pairs of segments with non-overlapping bounding boxes are rejected
+    without further tests. If NumPy is installed, the remaining pairs are
+    tested in one vectorised pass.
+
+    Parameters
+    ----------
+    segments_a : list of (point, point)
+        first list of line segments; the points are misc.XYPoint or
+        (numeric, numeric)
+    segments_b : list of (point, point)
+        second list of line segments
+
+    Returns
+    -------
+    check : list of lists of bool
+        check[i][j] is True if segment i of segments_a intersects segment j
+        of segments_b
+
+    """
+
+    if _np is None:
+        segments_a = [_as_xy_list(s) for s in segments_a]
+        segments_b = [_as_xy_list(s) for s in segments_b]
+        return [[lines_intersect(a[0], a[1], b[0], b[1]) for b in segments_b]
+                for a in segments_a]
+    if len(segments_a) == 0 or len(segments_b) == 0:
+        return [[] for _s in segments_a]
+
+    a = _np.array([_as_xy_array(s).ravel() for s in segments_a])
+    b = _np.array([_as_xy_array(s).ravel() for s in segments_b])
+    return _segments_intersect_kernel(a, b).tolist()
+
+def _segments_intersect_kernel(a, b):
+    """Intersection matrix of segment arrays a (n, 4) and b (m, 4)."""
+
+    ax, ay, bx, by = [a[:, i, None] for i in range(4)]
+    cx, cy, dx, dy = [b[None, :, i] for i in range(4)]
+    # bounding box rejection
+    check = (_np.minimum(ax, bx) <= _np.maximum(cx, dx)) & \
+            (_np.minimum(cx, dx) <= _np.maximum(ax, bx)) & \
+            (_np.minimum(ay, by) <= _np.maximum(cy, dy)) & \
+            (_np.minimum(cy, dy) <= _np.maximum(ay, by))
+    if not _np.any(check):
+        return check
+    return check & \
+           (_ccw(ax, ay, cx, cy, dx, dy) != _ccw(bx, by, cx, cy, dx, dy)) & \
+           (_ccw(ax, ay, bx, by, cx, cy) != _ccw(ax, ay, bx, by, dx, dy))
+
+def polygons_overlap(polygon_a, polygon_b):
+    """Return true if two polygons are overlapping.
+
+    Two polygons do not overlap if their bounding boxes do not overlap or if
+    no point of one polygon is inside the other one and their edges do not
+    intersect.
+
+    Parameters
+    ----------
+    polygon_a : list of misc.XYPoint or (numeric, numeric)
+        point list defining the first polygon
+    polygon_b : list of misc.XYPoint or (numeric, numeric)
+        point list defining the second polygon
+
+    Returns
+    -------
+    check : bool
+        True if overlapping
+
+    """
+
+    if len(polygon_a) == 0 or len(polygon_b) == 0:
+        return False
+    if _np is None:
+        polygon_a = _as_xy_list(polygon_a)
+        polygon_b = _as_xy_list(polygon_b)
+        if any(p.is_inside_polygon(polygon_b) for p in polygon_a) or \
+                any(p.is_inside_polygon(polygon_a) for p in polygon_b):
+            return True
+        edges_a = list(zip(polygon_a, polygon_a[1:] + polygon_a[:1]))
+        edges_b = list(zip(polygon_b, polygon_b[1:] + polygon_b[:1]))
+        return any(any(row) for row in segments_intersect(edges_a, edges_b))
+
+    return _polygons_overlap_kernel(_as_xy_array(polygon_a),
+                                    _as_xy_array(polygon_b))
+
+def _polygons_overlap_kernel(a, b):
+    """Overlap test of two polygon arrays (n, 2) and (m, 2)."""
+
+    min_a, max_a = a.min(axis=0), a.max(axis=0)
+    min_b, max_b = b.min(axis=0), b.max(axis=0)
+    if _np.any(max_a < min_b) or _np.any(max_b < min_a):
+        return False
+    # points of one polygon inside the other one
+    candidates = _np.all((a >= min_b) & (a <= max_b), axis=1)
+    if _np.any(candidates) and \
+            _np.any(_points_in_polygon_kernel(a[candidates], b)):
+        return True
+    candidates = _np.all((b >= min_a) & (b <= max_a), axis=1)
+    if _np.any(candidates) and \
+            _np.any(_points_in_polygon_kernel(b[candidates], a)):
+        return True
+    # intersecting edges
+    return bool(_np.any(_segments_intersect_kernel(_edges(a), _edges(b))))
+
+def polygons_overlap_matrix(polygons_a, polygons_b):
+    """Return for each pair of polygons whether they are overlapping.
+
+    Parameters
+    ----------
+    polygons_a : list of lists of misc.XYPoint or (numeric, numeric)
+        first list of polygons
+    polygons_b : list of lists of misc.XYPoint or (numeric, numeric)
+        second list of polygons
+
+    Returns
+    -------
+    check : list of lists of bool
+        check[i][j] is True if polygon i of polygons_a overlaps polygon j of
+        polygons_b
+
+    """
+
+    if _np is None:
+        return [[polygons_overlap(a, b) for b in polygons_b]
+                for a in polygons_a]
+
+    polygons_a = [_as_xy_array(p) for p in polygons_a]
+    polygons_b = [_as_xy_array(p) for p in polygons_b]
+    check = _np.zeros((len(polygons_a), len(polygons_b)), dtype=bool)
+    if len(polygons_a) == 0 or len(polygons_b) == 0:
+        return check.tolist()
+
+    def bounding_boxes(polygons):
+        boxes = _np.full((len(polygons), 4), _np.nan)
+        for i, p in enumerate(polygons):
+            if len(p) > 0:
+                boxes[i, :2] = p.min(axis=0)
+                boxes[i, 2:] = p.max(axis=0)
+        return boxes
+
+    box_a = bounding_boxes(polygons_a)
+    box_b = bounding_boxes(polygons_b)
+    # bounding box rejection of all pairs at once (NaN compares as False)
+    candidates = (box_a[:, None, 0] <= box_b[None, :, 2]) & \
+                 (box_b[None, :, 0] <= box_a[:, None, 2]) & \
+                 (box_a[:, None, 1] <= box_b[None, :, 3]) & \
+                 (box_b[None, :, 1] <= box_a[:, None, 3])
+    for i, j in zip(*_np.nonzero(candidates)):
+        check[i, j] = _polygons_overlap_kernel(polygons_a[i], polygons_b[j])
+    return check.tolist()
+
+def poisson_disc_sampling(size, min_distance, max_attempts=30,
+                          random_seed=None):
+    """Return random points with a minimal distance (Poisson-disc sampling).
+
+    The points are sampled with Bridson's algorithm ("Fast Poisson disk
+    sampling in arbitrary dimensions", 2007) and fill a rectangular area
+    centered at (0, 0) densely. No two points are closer than min_distance.
+
+    Parameters
+    ----------
+    size : (numeric, numeric)
+        size (width, height) of the area
+    min_distance : numeric
+        minimal distance between two points
+    max_attempts : int, optional
+        number of candidates around each point before it is rejected
+        (default = 30)
+    random_seed : int, optional
+        seed of the random number generator
+
+    Returns
+    -------
+    points : list of (float, float)
+        the points in the order they were created
+
+    """
+
+    rnd = _random.Random(random_seed)
+    width, height = size
+    cell_size = min_distance / _math.sqrt(2)
+    n_cols = int(_math.ceil(width / cell_size)) + 1
+    n_rows = int(_math.ceil(height / cell_size)) + 1
+    grid = [None] * (n_cols * n_rows)  # index of the point in each cell
+    points = []
+
+    def cell(x, y):
+        return int(x / cell_size), int(y / cell_size)
+
+    def is_free(x, y):
+        col, row = cell(x, y)
+        for r in range(max(row - 2, 0), min(row + 3, n_rows)):
+            for c in range(max(col - 2, 0), min(col + 3, n_cols)):
+                index = grid[r * n_cols + c]
+                if index is not None:
+                    px, py = points[index]
+                    if (px - x) ** 2 + (py - y) ** 2 < min_distance ** 2:
+                        return False
+        return True
+
+    def add(x, y):
+        col, row = cell(x, y)
+        grid[row * n_cols + col] = len(points)
+        points.append((x, y))
+        active.append(len(points) - 1)
+
+    active = []
+    add(rnd.random() * width, rnd.random() * height)
+    while len(active) > 0:
+        i = rnd.randrange(len(active))
+        px, py = points[active[i]]
+        for _attempt in range(max_attempts):
+            radius = min_distance * (1 + rnd.random())
+            angle = rnd.random() * 2 * _math.pi
+            x = px + radius * _math.cos(angle)
+            y = py + radius * _math.sin(angle)
+            if 0 <= x < width and 0 <= y < height and is_free(x, y):
+                add(x, y)
+                break
+        else:
+            active[i] = active[-1]
+            active.pop()
+    return [(x - width / 2.0, y - height / 2.0) for x, y in points]
+
+
+class SpatialGrid(object):
+    """A uniform grid for fast neighbourhood queries of rectangles.
+
+    Items are stored with their bounding rectangle in all grid cells the
+    rectangle overlaps. A query returns only the items in the cells of the
+    queried rectangle, which makes it unnecessary to check each item
+    against all others.
+
+    """
+
+    def __init__(self, cell_size):
+        """Create a spatial grid.
+
+        Parameters
+        ----------
+        cell_size : numeric
+            width and height of the grid cells (ideally about the size of
+            the items)
+
+        """
+
+        self._cell_size = float(max(cell_size, 1))
+        self._cells = {}
+        self._n_items = 0
+
+    def __len__(self):
+        return self._n_items
+
+    def _get_cells(self, rect):
+        left, bottom, right, top = rect
+        for col in range(int(_math.floor(left / self._cell_size)),
+                         int(_math.floor(right / self._cell_size)) + 1):
+            for row in range(int(_math.floor(bottom / self._cell_size)),
+                             int(_math.floor(top / self._cell_size)) + 1):
+                yield col, row
+
+    def add(self, item, rect):
+        """Add an item.
+
+        Parameters
+        ----------
+        item : object
+            the item
+        rect : (numeric, numeric, numeric, numeric)
+            bounding rectangle (left, bottom, right, top) of the item
+
+        """
+
+        for key in self._get_cells(rect):
+            self._cells.setdefault(key, []).append(item)
+        self._n_items += 1
+
+    def query(self, rect):
+        """Return the items that might overlap with a rectangle.
+
+        Parameters
+        ----------
+        rect : (numeric, numeric, numeric, numeric)
+            the rectangle (left, bottom, right, top)
+
+        Returns
+        -------
+        items : list
+            the items in the grid cells of the rectangle (each item once)
+
+        """
+
+        items = []
+        seen = set()
+        for key in self._get_cells(rect):
+            for item in self._cells.get(key, ()):
+                if id(item) not in seen:
+                    seen.add(id(item))
+                    items.append(item)
+        return items
+
+    def clear(self):
+        """Remove all items."""
+
+        self._cells = {}
+        self._n_items = 0
+
+
 class XYPoint(object):
     """ The Expyriment point class """
     def __init__(self, x=None, y=None, xy=None):
@@ -302,7 +726,7 @@ class XYPoint(object):
                 if self._y <= max(p1._y, p2._y):
                     if self._x <= max(p1._x, p2._x):
                         if p1._y != p2._y:
-                            xinters = (self._y - p1._y) * (p2._x - p1._x) // (p2._y - p1._y) + p1._x
+                            xinters = (self._y - p1._y) * (p2._x - p1._x) / (p2._y - p1._y) + p1._x
                         if p1._x == p2._x or self._x <= xinters:
                             inside = not inside
             p1 = p2
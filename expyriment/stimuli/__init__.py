@@ -28,5 +28,8 @@ from ._textbox import TextBox
 from ._textscreen import TextScreen
 from ._picture import Picture
 from ._tone import Tone
+from ._batch import Batch
+from ._render_cache import RenderCache
+from ._font_cache import FontCache, get_font_cache
 
 from ._obsolete import Dot, Frame
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+
+"""
+A batch of visual stimuli.
+
+This module contains a class implementing a batch of visual stimuli that are
+drawn together.
+
+"""
+from __future__ import absolute_import, print_function, division
+from builtins import *
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import ctypes
+
+try:
+    import OpenGL.GL as ogl
+except ImportError:
+    ogl = None
+
+from .. import _internals
+from ._stimulus import Stimulus
+from ..misc._timer import get_time
+
+
+class Batch(Stimulus):
+    """A class implementing a batch of visual stimuli.
+
+    A batch draws many visual stimuli at once. In OpenGL mode, the quads of
+    all stimuli are written into a single vertex buffer and drawn with one
+    blending and texturing setup; consecutive stimuli that share a texture
+    (e.g. identical distractors in a search display) are drawn with one call.
+    Without OpenGL, all surfaces are blitted to the screen in one go.
+
+    Stimuli are drawn in the order in which they were added.
+
+    """
+
+    def __init__(self, stimuli=None):
+        """Create a batch of visual stimuli.
+
+        Parameters
+        ----------
+        stimuli : list of visual stimuli, optional
+            the stimuli to draw
+
+        """
+
+        Stimulus.__init__(self)
+        self._stimuli = []
+        self._vbo = None
+        if stimuli is not None:
+            for stimulus in stimuli:
+                self.add(stimulus)
+
+    def __del__(self):
+        """Delete the vertex buffer when the object is deconstructed."""
+
+        if getattr(self, '_vbo', None) is not None:
+            try:
+                ogl.glDeleteBuffers(1, [self._vbo])
+            except:
+                pass
+
+    @property
+    def stimuli(self):
+        """Getter for stimuli."""
+
+        return list(self._stimuli)
+
+    def add(self, stimulus):
+        """Add a visual stimulus to the batch.
+
+        Parameters
+        ----------
+        stimulus : visual expyriment stimulus
+            the stimulus to add
+
+        """
+
+        self._stimuli.append(stimulus)
+
+    def clear(self):
+        """Remove all stimuli from the batch."""
+
+        self._stimuli = []
+
+    @property
+    def is_preloaded(self):
+        """Getter for is_preloaded."""
+
+        for stimulus in self._stimuli:
+            if not stimulus.is_preloaded:
+                return False
+        return True
+
+    def preload(self):
+        """Preload all stimuli of the batch.
+
+        Returns
+        -------
+        time : int
+            the time it took to execute this method
+
+        """
+
+        start = get_time()
+        for stimulus in self._stimuli:
+            if not stimulus.is_preloaded:
+                stimulus.preload()
+        return int((get_time() - start) * 1000)
+
+    def present(self, clear=True, update=True, log_event_tag=None):
+        """Present all stimuli of the batch on the screen.
+
+        Stimuli that are not preloaded yet will be preloaded (and stay
+        preloaded) before presenting.
+
+        Parameters
+        ----------
+        clear : bool, optional
+            if True the screen will be cleared automatically
+            (default = True)
+        update : bool, optional
+            if False the screen will be not be updated automatically
+            (default = True)
+        log_event_tag : numeral or string, optional
+            if log_event_tag is defined and if logging is switched on for this
+            stimulus (default), a summary of the inter-event-intervalls are
+            appended at the end of the event file
+
+        Returns
+        -------
+        time : int
+            the time it took to execute this method
+
+        """
+
+        if not _internals.active_exp.is_initialized or\
+                             _internals.active_exp.screen is None:
+            raise RuntimeError("Cannot not find a screen!")
+
+        start = get_time()
+        self.preload()
+        if clear:
+            _internals.active_exp.screen.clear()
+        if _internals.active_exp.screen.open_gl:
+            self._draw_open_gl()
+        else:
+            self._draw_pygame()
+        if self._logging:
+            _internals.active_exp._event_file_log("Stimulus,presented,{0}"\
+                                   .format(self.id), 1,
+                                 log_event_tag=log_event_tag)
+        if update:
+            _internals.active_exp.screen._presented_stimulus = self.id
+            _internals.active_exp.screen.update()
+        return int((get_time() - start) * 1000)
+
+    def _draw_pygame(self):
+        """Blit all stimuli to the screen surface."""
+
+        screen = _internals.active_exp.screen.surface
+        half_screen_size = (screen.get_width() // 2, screen.get_height() // 2)
+        blit_sequence = []
+        for stimulus in self._stimuli:
+            surface = stimulus._get_surface()
+            rect = surface.get_rect()
+            rect.center = [stimulus.position[0] + half_screen_size[0],
+                           - stimulus.position[1] + half_screen_size[1]]
+            blit_sequence.append((surface, rect))
+        if hasattr(screen, "blits"):
+            screen.blits(blit_sequence, doreturn=False)
+        else:
+            for surface, rect in blit_sequence:
+                screen.blit(surface, rect)
+        for _surface, rect in blit_sequence:
+            _internals.active_exp.screen.mark_dirty(rect)
+
+    def _draw_open_gl(self):
+        """Draw the quads of all stimuli from one vertex buffer."""
+
+        if len(self._stimuli) == 0:
+            return
+        # interleaved vertex data (x, y, s, t) and runs of equal textures
+        vertices = []
+        runs = []
+        for stimulus in self._stimuli:
+            panel = stimulus._ogl_screen
+            for vertex, texcoord in zip(panel.dims, panel._texcoords):
+                vertices.extend((vertex[0], vertex[1],
+                                 texcoord[0], texcoord[1]))
+            if len(runs) > 0 and runs[-1][0] == panel._txtr:
+                runs[-1][2] += 4
+            else:
+                first = 0 if len(runs) == 0 else runs[-1][1] + runs[-1][2]
+                runs.append([panel._txtr, first, 4])
+        data = (ctypes.c_float * len(vertices))(*vertices)
+
+        if self._vbo is None:
+            self._vbo = ogl.glGenBuffers(1)
+        ogl.glBindBuffer(ogl.GL_ARRAY_BUFFER, self._vbo)
+        ogl.glBufferData(ogl.GL_ARRAY_BUFFER, ctypes.sizeof(data), data,
+                         ogl.GL_STREAM_DRAW)
+        stride = 4 * ctypes.sizeof(ctypes.c_float)
+        ogl.glEnableClientState(ogl.GL_VERTEX_ARRAY)
+        ogl.glEnableClientState(ogl.GL_TEXTURE_COORD_ARRAY)
+        ogl.glVertexPointer(2, ogl.GL_FLOAT, stride, ctypes.c_void_p(0))
+        ogl.glTexCoordPointer(2, ogl.GL_FLOAT, stride,
+                              ctypes.c_void_p(2 * ctypes.sizeof(
+                                  ctypes.c_float)))
+
+        ogl.glEnable(ogl.GL_BLEND)
+        ogl.glBlendFunc(ogl.GL_SRC_ALPHA, ogl.GL_ONE_MINUS_SRC_ALPHA)
+        ogl.glEnable(ogl.GL_TEXTURE_2D)
+        ogl.glTexEnvf(ogl.GL_TEXTURE_ENV, ogl.GL_TEXTURE_ENV_MODE,
+                      ogl.GL_REPLACE)
+        for texture, first, count in runs:
+            ogl.glBindTexture(ogl.GL_TEXTURE_2D, texture)
+            ogl.glTexParameterfv(ogl.GL_TEXTURE_2D,
+                                 ogl.GL_TEXTURE_MIN_FILTER, ogl.GL_LINEAR)
+            ogl.glDrawArrays(ogl.GL_QUADS, first, count)
+        ogl.glDisable(ogl.GL_BLEND)
+        ogl.glDisable(ogl.GL_TEXTURE_2D)
+
+        ogl.glDisableClientState(ogl.GL_TEXTURE_COORD_ARRAY)
+        ogl.glDisableClientState(ogl.GL_VERTEX_ARRAY)
+        ogl.glBindBuffer(ogl.GL_ARRAY_BUFFER, 0)
+
+
+if __name__ == "__main__":
+    from .. import control
+    from ._circle import Circle
+    control.set_develop_mode(True)
+    control.defaults.event_logging = 0
+    exp = control.initialize()
+    batch = Batch()
+    for x in range(-300, 301, 30):
+        for y in range(-200, 201, 30):
+            batch.add(Circle(radius=5, position=(x, y)))
+    batch.preload()
+    batch.present()
+    exp.clock.wait(1000)
@@ -0,0 +1,228 @@
+"""
+A font cache.
+
+This module contains a class implementing a bounded cache of the font objects
+used by text stimuli.
+
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import (ascii, bytes, chr, dict, filter, hex, input,
+                      int, map, next, oct, pow, range, round,
+                      str, super, zip) # without open, because
+                      # pygame.font.Font needs old file object under PY2
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import pygame
+
+from . import defaults
+
+
+class FontCache(object):
+    """A class implementing a bounded cache of pygame fonts.
+
+    Fonts are cached by font file, size and style (bold, italic, underline).
+    If the cache exceeds its maximal number of fonts, the least recently
+    used fonts are removed. Since pygame reads a font file lazily, the file
+    handle of a font is only closed when the font itself is garbage
+    collected. Font files are validated only once.
+
+    The cache is shared by all text stimuli (see get_font_cache). Accessing
+    the cache is thread-safe, but the returned fonts (like all of pygame)
+    should only be used in the main thread.
+
+    """
+
+    def __init__(self, max_fonts=None):
+        """Create a font cache.
+
+        Parameters
+        ----------
+        max_fonts : int, optional
+            maximal number of fonts in the cache; 'None' is
+            stimuli.defaults.font_cache_size
+
+        """
+
+        if max_fonts is None:
+            max_fonts = defaults.font_cache_size
+        self._max_fonts = max_fonts
+        self._fonts = OrderedDict()  # key: font
+        self._lock = threading.RLock()
+        self._validated = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._fonts)
+
+    @property
+    def max_fonts(self):
+        """Getter for max_fonts."""
+
+        return self._max_fonts
+
+    @max_fonts.setter
+    def max_fonts(self, value):
+        """Setter for max_fonts."""
+
+        with self._lock:
+            self._max_fonts = value
+            self._evict()
+
+    @property
+    def keys(self):
+        """Getter for the keys, least recently used first."""
+
+        with self._lock:
+            return list(self._fonts.keys())
+
+    def validate(self, font_file):
+        """Return true if a font file can be loaded.
+
+        The result is cached for each font file.
+
+        Parameters
+        ----------
+        font_file : str
+            path to the font file
+
+        Returns
+        -------
+        valid : bool
+
+        """
+
+        with self._lock:
+            if font_file not in self._validated:
+                pygame.font.init()
+                try:
+                    with open(font_file, 'rb') as f:
+                        pygame.font.Font(f, 10)
+                    self._validated[font_file] = True
+                except:
+                    self._validated[font_file] = False
+            return self._validated[font_file]
+
+    def get_font(self, font_file, size, bold=False, italic=False,
+                 underline=False):
+        """Get a font from the cache.
+
+        The font is loaded, if it is not in the cache.
+
+        Parameters
+        ----------
+        font_file : str
+            path to the font file (or name of the font)
+        size : int
+            size of the font
+        bold : bool, optional
+            bold font (default = False)
+        italic : bool, optional
+            italic font (default = False)
+        underline : bool, optional
+            underlined font (default = False)
+
+        Returns
+        -------
+        font : pygame.font.Font
+
+        Notes
+        -----
+        The font object is shared and should not be modified.
+
+        """
+
+        key = (font_file, size, bool(bold), bool(italic), bool(underline))
+        with self._lock:
+            if key in self._fonts:
+                self._fonts[key] = self._fonts.pop(key)
+                self.hits += 1
+                return self._fonts[key]
+
+            self.misses += 1
+            pygame.font.init()
+            # Due to a bug in handling file names in PyGame 1.9.2, we pass a
+            # file handle to PyGame. See also:
+            # https://github.com/expyriment/expyriment/issues/81
+            if os.path.isfile(font_file):
+                f = open(font_file, 'rb')
+                try:
+                    font = pygame.font.Font(f, size)
+                except:
+                    f.close()
+                    raise
+                _font_files[weakref.ref(font, _close_font_file)] = f
+            else:
+                font = pygame.font.Font(font_file, size)
+            font.set_bold(bold)
+            font.set_italic(italic)
+            font.set_underline(underline)
+            self._fonts[key] = font
+            self._evict()
+            return font
+
+    def remove(self, key):
+        """Remove a font from the cache.
+
+        Parameters
+        ----------
+        key : (str, int, bool, bool, bool)
+            the key (font_file, size, bold, italic, underline) of the font
+
+        """
+
+        with self._lock:
+            self._fonts.pop(key, None)
+
+    def clear(self):
+        """Remove all fonts from the cache."""
+
+        with self._lock:
+            self._fonts.clear()
+            self._validated = {}
+
+    def _evict(self):
+        """Remove least recently used fonts until the cache fits."""
+
+        if self._max_fonts is None:
+            return
+        while len(self._fonts) > max(self._max_fonts, 1):
+            self.remove(next(iter(self._fonts)))
+
+
+_font_files = {}  # weak reference to a font: its file handle
+
+
+def _close_font_file(reference):
+    """Close the file handle of a garbage collected font."""
+
+    f = _font_files.pop(reference, None)
+    if f is not None:
+        f.close()
+
+
+_font_cache = None
+_font_cache_lock = threading.Lock()
+
+
+def get_font_cache():
+    """Return the font cache shared by all text stimuli."""
+
+    global _font_cache
+    with _font_cache_lock:
+        if _font_cache is None:
+            _font_cache = FontCache()
+        elif _font_cache.max_fonts != defaults.font_cache_size:
+            _font_cache.max_fonts = defaults.font_cache_size
+        return _font_cache
@@ -159,7 +159,8 @@ class Line(Visual):
 
         Notes
         -----
-        When using OpenGL, this can take longer then 1ms!
+        When using OpenGL, only the vertex positions of a preloaded stimulus
+        are updated (no texture upload and no new preloading).
 
         """
 
@@ -174,7 +175,7 @@ class Line(Visual):
             self._position[1] = self._position[1] + y
             moved = True
         if moved and self._ogl_screen is not None:
-            self._ogl_screen.refresh_position()
+            self._ogl_screen.reposition(self._position)
         self._start_point[0] = self._start_point[0] + x
         self._start_point[1] = self._start_point[1] + y
         self._end_point[0] = self._end_point[0] + x
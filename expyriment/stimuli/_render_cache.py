@@ -0,0 +1,334 @@
+"""
+A persistent render cache.
+
+This module contains a class implementing a cache on disk for the results of
+expensive stimulus generation (e.g. Gabor patches, visual masks or the dot
+positions of clouds).
+
+"""
+from __future__ import absolute_import, print_function, division
+from builtins import *
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import os
+import ast
+import csv
+import json
+import mmap
+import tempfile
+from hashlib import md5
+from collections import OrderedDict
+
+import pygame
+
+from . import defaults
+from .. import _internals
+
+
+class RenderCache(object):
+    """A class implementing a persistent render cache.
+
+    Each entry is stored in its own file in the cache directory. The file
+    starts with a line of JSON (size of the pixel buffer and metadata)
+    followed by the raw RGBA pixel buffer, which is memory-mapped for
+    reading. Entries are keyed by the class name, the parameters, the random
+    seed and the Expyriment version. If the cache exceeds its maximal size,
+    the least recently used entries are removed.
+
+    The cache is used by generated stimuli (see stimuli.defaults.render_cache).
+    Stimuli with random elements are only cached if a random seed is given.
+
+    """
+
+    _suffix = ".cache"
+
+    def __init__(self, directory=None, max_size=None):
+        """Create a render cache.
+
+        Parameters
+        ----------
+        directory : str, optional
+            the directory of the cache (default:
+            stimuli.defaults.render_cache_directory)
+        max_size : int, optional
+            maximal size of the cache in MB; 'None' is
+            stimuli.defaults.render_cache_size
+
+        """
+
+        if directory is None:
+            directory = defaults.render_cache_directory
+        if directory is None:
+            directory = os.path.join(tempfile.gettempdir(),
+                                     "expyriment_render_cache")
+        if max_size is None:
+            max_size = defaults.render_cache_size
+        self._directory = directory
+        self._max_size = max_size
+        self._entries = OrderedDict()  # key: size, least recently used first
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        files = []
+        for filename in os.listdir(directory):
+            if filename.endswith(RenderCache._suffix):
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime,
+                              filename[:-len(RenderCache._suffix)],
+                              stat.st_size))
+        for _mtime, key, size in sorted(files):
+            self._entries[key] = size
+
+    @property
+    def directory(self):
+        """Getter for directory."""
+
+        return self._directory
+
+    @property
+    def max_size(self):
+        """Getter for max_size."""
+
+        return self._max_size
+
+    @property
+    def size(self):
+        """Getter for the size of the cache in bytes."""
+
+        return sum(self._entries.values())
+
+    @property
+    def keys(self):
+        """Getter for the keys, least recently used first."""
+
+        return list(self._entries.keys())
+
+    @staticmethod
+    def make_key(class_name, parameters, random_seed=None):
+        """Return the key of a stimulus.
+
+        Parameters
+        ----------
+        class_name : str
+            name of the stimulus class
+        parameters : dict
+            the parameters the stimulus depends on
+        random_seed : int, optional
+            the random seed
+
+        Returns
+        -------
+        key : str
+
+        """
+
+        description = repr((class_name, sorted(parameters.items()),
+                            random_seed, _internals.get_version()))
+        return md5(description.encode("utf-8")).hexdigest()
+
+    def _get_path(self, key):
+        return os.path.join(self._directory, key + RenderCache._suffix)
+
+    def get(self, key):
+        """Get an entry from the cache.
+
+        Parameters
+        ----------
+        key : str
+            the key of the entry
+
+        Returns
+        -------
+        entry : (pygame.Surface, metadata) or None
+            the surface (or None, if no surface has been stored) and the
+            metadata of the entry; None if the entry is not in the cache
+
+        """
+
+        path = self._get_path(key)
+        if key not in self._entries:
+            # might have been added by another process
+            if not os.path.isfile(path):
+                self.misses += 1
+                return None
+            self._entries[key] = os.path.getsize(path)
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    offset = mapped.find(b"\n") + 1
+                    header = json.loads(mapped[:offset].decode("utf-8"))
+                    surface = None
+                    if header["size"] is not None:
+                        size = tuple(header["size"])
+                        surface = pygame.image.fromstring(
+                            mapped[offset:offset + size[0] * size[1] * 4],
+                            size, "RGBA")
+                        if pygame.display.get_init() and \
+                                pygame.display.get_surface() is not None:
+                            surface = surface.convert_alpha()
+                finally:
+                    mapped.close()
+            os.utime(path, None)
+        except (OSError, IOError, ValueError, KeyError):
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries[key] = self._entries.pop(key)
+        self.hits += 1
+        return surface, header["metadata"]
+
+    def put(self, key, surface=None, metadata=None):
+        """Store an entry in the cache.
+
+        Parameters
+        ----------
+        key : str
+            the key of the entry
+        surface : pygame.Surface, optional
+            the rendered surface
+        metadata : JSON serializable object, optional
+            additional data of the entry (e.g. positions)
+
+        """
+
+        if surface is not None:
+            size = list(surface.get_size())
+            data = pygame.image.tostring(surface, "RGBA")
+        else:
+            size = None
+            data = b""
+        header = json.dumps({"size": size, "metadata": metadata})
+        path = self._get_path(key)
+        fid, tmp_path = tempfile.mkstemp(dir=self._directory,
+                                         suffix=".tmp")
+        try:
+            with os.fdopen(fid, 'wb') as f:
+                f.write(header.encode("utf-8") + b"\n")
+                f.write(data)
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(tmp_path, path)
+        except (OSError, IOError):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self._entries.pop(key, None)
+        self._entries[key] = os.path.getsize(path)
+        self._evict()
+
+    def remove(self, key):
+        """Remove an entry from the cache.
+
+        Parameters
+        ----------
+        key : str
+            the key of the entry
+
+        """
+
+        if self._entries.pop(key, None) is not None:
+            try:
+                os.remove(self._get_path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove all entries from the cache."""
+
+        for key in list(self._entries.keys()):
+            self.remove(key)
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits."""
+
+        if self._max_size is None:
+            return
+        max_bytes = self._max_size * 1024 * 1024
+        size = self.size
+        while size > max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            size -= self._entries[key]
+            self.remove(key)
+
+    def warm_up(self, filename):
+        """Fill the cache ahead of time from a design file.
+
+        The design file is a CSV file with a column 'stimulus' containing the
+        class name of a stimulus (e.g. GaborPatch) and a column for each
+        parameter of its constructor. Values are interpreted as Python
+        literals (e.g. numbers or tuples), otherwise as strings. Empty cells
+        are not passed to the constructor.
+
+        Only stimuli that are rendered by their constructor can be warmed up
+        (e.g. GaborPatch, or VisualMask with a random seed). The arrangements
+        created by DotCloud.make and StimulusCloud.make are cached when
+        these methods are called, but they cannot be warmed up with this
+        method.
+
+        Parameters
+        ----------
+        filename : str
+            name of the design file
+
+        Returns
+        -------
+        n_stimuli : int
+            number of stimuli that have been created
+
+        """
+
+        from .. import stimuli
+        from . import extras
+        n_stimuli = 0
+        with open(filename) as f:
+            for row in csv.DictReader(f):
+                name = row.pop("stimulus").strip()
+                if hasattr(extras, name):
+                    cls = getattr(extras, name)
+                else:
+                    cls = getattr(stimuli, name)
+                parameters = {}
+                for parameter, value in row.items():
+                    if value is None or value.strip() == "":
+                        continue
+                    try:
+                        parameters[parameter] = ast.literal_eval(value.strip())
+                    except (ValueError, SyntaxError):
+                        parameters[parameter] = value.strip()
+                cls(**parameters)
+                n_stimuli += 1
+        return n_stimuli
+
+
+_render_cache = None
+
+
+def get_render_cache():
+    """Return the render cache as set in the defaults (or None, if off)."""
+
+    global _render_cache
+    if not defaults.render_cache:
+        return None
+    if _render_cache is None or \
+            _render_cache.max_size != defaults.render_cache_size or \
+            (defaults.render_cache_directory is not None and
+             _render_cache.directory != defaults.render_cache_directory):
+        try:
+            _render_cache = RenderCache()
+        except (OSError, IOError):
+            return None
+    return _render_cache
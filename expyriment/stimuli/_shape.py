@@ -18,14 +18,19 @@ __revision__ = ''
 __date__ = ''
 
 import copy
-from math import sqrt
+from math import sqrt, sin, cos, radians
 import pygame
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 from . import defaults
 from ._visual import Visual
 from .. import _internals
 from ..misc._timer import get_time
-from ..misc.geometry import XYPoint, lines_intersect
+from ..misc.geometry import XYPoint, points_in_polygon, polygons_overlap, \
+                            polygons_overlap_matrix
 
 class Shape(Visual):
     """A class implementing a shape."""
@@ -90,8 +95,6 @@ class Shape(Visual):
             self._anti_aliasing = defaults.shape_anti_aliasing
 
         self._vertices = []
-        self._xy_points = []
-        self._rect = []
         self._native_rotation = 0
         self._native_scaling = [1, 1]
         self._native_rotation_centre = (0, 0)
@@ -144,7 +147,7 @@ class Shape(Visual):
         """Setter for rotation_centre."""
 
         self._native_rotation_centre = centre
-        self._update_points()
+        self._update_transform()
 
 
     @property
@@ -163,15 +166,14 @@ class Shape(Visual):
         """
 
         self._rotation_centre_display_colour = colour
-        self._update_points()
 
     @property
     def width(self):
-        return self._rect[3] - self._rect[1]#r-l
+        return self.rect[3] - self.rect[1]#r-l
 
     @property
     def height(self):
-        return self._rect[0] - self._rect[2]#t-b
+        return self.rect[0] - self.rect[2]#t-b
 
     @property
     def shape_size(self):
@@ -185,6 +187,9 @@ class Shape(Visual):
     def rect(self):
         """Getter for rect =(top, left, bottom, right)."""
 
+        if self._rect is None:
+            l, b, r, t = Shape._bounding_box(self._get_points_array())
+            self._rect = (t, l, b, r)
         return self._rect
 
     @property
@@ -208,10 +213,7 @@ class Shape(Visual):
 
         """
 
-        rtn = []
-        for p in self.xy_points:
-            rtn.append(p.tuple)
-        return rtn
+        return [(x, y) for x, y in self._get_points_array()]
 
     @property
     def points_on_screen(self):
@@ -228,10 +230,7 @@ class Shape(Visual):
 
         """
 
-        rtn = []
-        for p in self.xy_points_on_screen:
-            rtn.append(p.tuple)
-        return rtn
+        return [(x, y) for x, y in self._get_points_on_screen_array()]
 
     @property
     def scaling(self):
@@ -264,8 +263,16 @@ class Shape(Visual):
         val: list of XYPoints
              polygon as list of XYPoints of the shape
 
+        Notes
+        -----
+        The list is cached until the shape changes and should not be
+        modified.
+
         """
 
+        if self._xy_points is None:
+            self._xy_points = [XYPoint(x, y)
+                               for x, y in self._get_points_array()]
         return self._xy_points
 
     @property
@@ -281,13 +288,17 @@ class Shape(Visual):
         val: list of XYPoints
              polygon as list of XYPoints of the shape
 
+        Notes
+        -----
+        The list is cached until the shape or its position changes and should
+        not be modified.
+
         """
 
-        rtn = []
-        pos = XYPoint(xy=self.position)
-        for p in copy.deepcopy(self.xy_points):
-            rtn.append(p.move(pos))
-        return rtn
+        points = self._get_points_on_screen_array()
+        if self._screen_points[2] is None:
+            self._screen_points[2] = [XYPoint(x, y) for x, y in points]
+        return self._screen_points[2]
 
     def add_vertex(self, xy):
         """ Add a vertex to the shape.
@@ -343,8 +354,6 @@ class Shape(Visual):
                 "erase_vertices"))
 
         self._vertices = []
-        self._xy_points = []
-        self._rect = []
         self._native_rotation = 0
         self._native_scaling = [1, 1]
         self._native_rotation_centre = (0, 0)
@@ -378,8 +387,30 @@ class Shape(Visual):
 
         """
 
-        pt = XYPoint(position)
-        return pt.is_inside_polygon(self.xy_points_on_screen)
+        return points_in_polygon([position],
+                                 self._get_points_on_screen_array())[0]
+
+    def native_overlapping_with_positions(self, positions):
+        """Return for each position whether it is inside the shape.
+
+        All positions are tested at once, which is much faster than calling
+        native_overlapping_with_position for each position (e.g. for all
+        samples of a mouse trajectory).
+
+        Parameters
+        ----------
+        positions : list of (int, int)
+            Expyriment screen coordinates
+
+        Returns
+        -------
+        val : list of bool
+            True for each position inside the shape
+
+        """
+
+        return points_in_polygon(positions,
+                                 self._get_points_on_screen_array())
 
     def is_point_inside(self, point_xy):
         """"OBSOLETE METHOD: Please use 'overlapping_with_position'."""
@@ -401,29 +432,34 @@ class Shape(Visual):
 
         """
 
-        # shape and other shape do not overlap if 
-        # (a) no point of shape is inside other shape 
-        # (b) AND no point of other shape is inside shape
-        # (c) AND lines do not intersect
-
-        s1 = self.xy_points_on_screen
-        s2 = other.xy_points_on_screen
-        #(a) & (b)
-        for p in s1:
-            if p.is_inside_polygon(s2):
-                return True
-        for p in s2:
-            if p.is_inside_polygon(s1):
-                return True
-        #(c)
-        for from1 in range(0, len(s1) - 1):
-            for to1 in range(from1 + 1, len(s1)):
-                for from2 in range(0, len(s2) - 1):
-                    for to2 in range(0, len(s2)):
-                        if lines_intersect(s1[from1],
-                                                s1[to1], s2[from2], s2[to2]):
-                            return True
-        return False
+        return polygons_overlap(self._get_points_on_screen_array(),
+                                other._get_points_on_screen_array())
+
+    def overlapping_with_shapes(self, others):
+        """Return for each of the other shapes whether the shape overlaps.
+
+        Parameters
+        ----------
+        others : list of stimuli.Shape
+            the other shape objects
+
+        Returns
+        -------
+        val : list of bool
+            True for each overlapping shape
+
+        Notes
+        -----
+        Shapes whose bounding boxes do not overlap are rejected at once. To
+        test many points or shapes against many shapes, see also
+        misc.geometry.points_in_polygons and
+        misc.geometry.polygons_overlap_matrix.
+
+        """
+
+        return polygons_overlap_matrix(
+            [self._get_points_on_screen_array()],
+            [other._get_points_on_screen_array() for other in others])[0]
 
     def is_shape_overlapping(self, shape2):
         """OBSOLETE METHOD: Please use 'overlapping_with_shape'."""
@@ -448,7 +484,7 @@ class Shape(Visual):
             raise AttributeError(Shape._getter_exception_message.format(
                 "native_rotate"))
         self._native_rotation = self._native_rotation + degree
-        self._update_points()
+        self._update_transform()
 
     def native_scale(self, factors, scale_line_width=False):
         """Scale the shape.
@@ -479,7 +515,7 @@ class Shape(Visual):
         self._native_scaling[1] = self._native_scaling[1] * factors[1]
         if scale_line_width:
             self._line_width = self._line_width * sqrt(factors[0] * factors[1])
-        self._update_points()
+        self._update_transform()
 
     def native_flip(self, booleans):
         """Flip the shape.
@@ -502,7 +538,7 @@ class Shape(Visual):
             self._native_scaling[0] = self._native_scaling[0] * -1
         if booleans[1]:
             self._native_scaling[1] = self._native_scaling[1] * -1
-        self._update_points()
+        self._update_transform()
 
     def blur(self, level):
         """Blur the shape.
@@ -542,65 +578,150 @@ class Shape(Visual):
         return (vertex[0] - cmp(vertex[0], 0),  vertex[1])
 
     def _update_points(self):
-        """Updates the points of the shape and the drawing rect.
-
-        Converts vertex to points, centers points, rotates, calculates rect and
-        clears surface and draw_rotation_point.
-
-         """
-
-        # Copying and scaling and flipping of verticies
-        tmp_vtx = []
-        for v in self._vertices:
-            v = (v[0] * self._native_scaling[0],
-                 v[1] * self._native_scaling[1])
-            tmp_vtx.append(v)
-
-        # Converts tmp_vtx to points in xy-coordinates
-        xy_p = [XYPoint(0, 0)]
-        for v in map(Shape._compensate_for_pygame_polygon_bug ,tmp_vtx):
-            x = (v[0] + xy_p[-1].x)
-            y = (v[1] + xy_p[-1].y)
-            xy_p.append(XYPoint(x, y))
-
-        xy_p = self._center_points(xy_p)
-        if self._native_rotation != 0:
-            for x in range(0, len(xy_p)):
-                xy_p[x].rotate(self._native_rotation,
-                               self._native_rotation_centre)
-
-        self._xy_points = xy_p
-        self._rect = self._make_shape_rect(self.xy_points)
-
-    def _make_shape_rect(self, points):
-        """Four points (geomerty.XYPoint) top, left, bottom, right."""
-
-        t = 0
-        l = 0
-        r = 0
-        b = 0
-        for p in points:
-            if p.x < l:
-                l = p.x
-            elif p.x > r:
-                r = p.x
-            if p.y > t:
-                t = p.y
-            elif p.y < b:
-                b = p.y
-        return (t, l, b, r)
-
-    def _center_points(self, points):
-        """Return centered points (list of geomerty.XYPoint)."""
-
-        t, l, b, r = self._make_shape_rect(points)
-
-        # Stimulus center
-        c = XYPoint(((r - l) / 2.0) - r,
-                                             ((t - b) / 2.0) - t)
-        for x in range(0, len(points)): # Center points
-            points[x].move(c)
-        return points
+        """Invalidate the points of the shape after a change of the vertices.
+
+        The points and the drawing rect are recomputed lazily on the next
+        access.
+
+        """
+
+        self._vertex_sums = None
+        self._centre_offset = None
+        self._update_transform()
+
+    def _update_transform(self):
+        """Invalidate the points of the shape after a native transformation.
+
+        Clears the cached points, the drawing rect and the points on screen.
+
+        """
+
+        self._points_array = None
+        self._xy_points = None
+        self._rect = None
+        self._screen_points = None
+
+    def _get_vertex_sums(self):
+        """Return the cumulative sums of the vertices.
+
+        Each row contains the x and y coordinates of a point of the
+        untransformed shape and the sum of the signs of the horizontal
+        movements (see _compensate_for_pygame_polygon_bug). The points of the
+        shape are an affine transformation of these rows (x, sign, y).
+
+        """
+
+        if self._vertex_sums is None:
+            if np is not None:
+                vtx = np.array(self._vertices, dtype=float).reshape(-1, 2)
+                sums = np.zeros((len(vtx) + 1, 3))
+                sums[1:, 0] = np.cumsum(vtx[:, 0])
+                sums[1:, 1] = np.cumsum(np.sign(vtx[:, 0]))
+                sums[1:, 2] = np.cumsum(vtx[:, 1])
+            else:
+                sums = [(0, 0, 0)]
+                for v in self._vertices:
+                    x, s, y = sums[-1]
+                    sums.append((x + v[0], s + cmp(v[0], 0), y + v[1]))
+            self._vertex_sums = sums
+        return self._vertex_sums
+
+    @staticmethod
+    def _apply_transform(sums, matrix, translation=(0, 0)):
+        """Apply a 2x3 matrix and a translation to the vertex sums."""
+
+        if np is not None:
+            return np.dot(sums, np.array(matrix, dtype=float).T) + \
+                   np.array(translation, dtype=float)
+        return [(matrix[0][0] * x + matrix[0][1] * s + matrix[0][2] * y +
+                 translation[0],
+                 matrix[1][0] * x + matrix[1][1] * s + matrix[1][2] * y +
+                 translation[1]) for x, s, y in sums]
+
+    @staticmethod
+    def _bounding_box(points):
+        """Return (left, bottom, right, top) of the points and the origin."""
+
+        if np is not None:
+            if len(points) == 0:
+                return (0, 0, 0, 0)
+            l, b = np.minimum(points.min(axis=0), 0).tolist()
+            r, t = np.maximum(points.max(axis=0), 0).tolist()
+            return (l, b, r, t)
+        xs = [p[0] for p in points] + [0]
+        ys = [p[1] for p in points] + [0]
+        return (min(xs), min(ys), max(xs), max(ys))
+
+    def _get_transform(self):
+        """Return the affine transformation of the vertex sums to points.
+
+        The transformation is composed of scaling/flipping (including the
+        compensation for the pygame polygon bug), centering and rotation
+        around the rotation centre.
+
+        Returns
+        -------
+        matrix : ((float, float, float), (float, float, float))
+        translation : (float, float)
+
+        """
+
+        sx, sy = self._native_scaling
+        scaling = ((sx, -cmp(sx, 0), 0), (0, 0, sy))
+
+        # centering depends only on vertices and scaling
+        if self._centre_offset is None or \
+                self._centre_offset[0] != (sx, sy):
+            l, b, r, t = Shape._bounding_box(Shape._apply_transform(
+                self._get_vertex_sums(), scaling))
+            self._centre_offset = ((sx, sy),
+                                   (((r - l) / 2.0) - r, ((t - b) / 2.0) - t))
+        cx, cy = self._centre_offset[1]
+
+        if self._native_rotation == 0:
+            return scaling, (cx, cy)
+
+        # rotate counterclockwise around the rotation centre
+        rad = radians(self._native_rotation)
+        cos_a, sin_a = cos(rad), sin(rad)
+        qx, qy = self._native_rotation_centre
+        matrix = ((cos_a * sx, -cos_a * cmp(sx, 0), -sin_a * sy),
+                  (sin_a * sx, -sin_a * cmp(sx, 0), cos_a * sy))
+        translation = (cos_a * (cx - qx) - sin_a * (cy - qy) + qx,
+                       sin_a * (cx - qx) + cos_a * (cy - qy) + qy)
+        return matrix, translation
+
+    def _get_points_array(self):
+        """Return the (cached) points of the shape.
+
+        Returns
+        -------
+        points : numpy.ndarray or list of (float, float)
+            array (n, 2) of points, or list of points if NumPy is not
+            installed
+
+        """
+
+        if self._points_array is None:
+            matrix, translation = self._get_transform()
+            self._points_array = Shape._apply_transform(
+                self._get_vertex_sums(), matrix, translation)
+        return self._points_array
+
+    def _get_points_on_screen_array(self):
+        """Return the (cached) points of the shape moved by the position."""
+
+        position = tuple(self.position)
+        if self._screen_points is None or \
+                self._screen_points[0] != position:
+            points = self._get_points_array()
+            if np is not None:
+                points = points + np.array(position, dtype=float)
+            else:
+                points = [(x + position[0], y + position[1])
+                          for x, y in points]
+            self._screen_points = [position, points, None]
+        return self._screen_points[1]
 
     def _create_surface(self):
         """Create the surface of the stimulus."""
@@ -619,8 +740,8 @@ class Shape(Visual):
         #surface.fill((255, 0, 0)) # for debugging only
         #create polygon
         poly = []
-        for p in self.xy_points: # Convert points_in_pygame_coordinates
-            poly.append(self.convert_expyriment_xy_to_surface_xy(p.tuple))
+        for p in self.points: # Convert points_in_pygame_coordinates
+            poly.append(self.convert_expyriment_xy_to_surface_xy(p))
         pygame.draw.polygon(surface, self.colour, poly, line_width)
 
         rot_centre = self.convert_expyriment_xy_to_surface_xy(
@@ -635,7 +756,7 @@ class Shape(Visual):
                                 (int(size[0] / aa_scaling),
                                  int(size[1] / aa_scaling)))
             self._native_scaling = old_scaling
-            self._update_points()
+            self._update_transform()
         return surface
 
 
@@ -0,0 +1,224 @@
+"""
+Text layout.
+
+This module contains functions to word-wrap and render text with cached
+glyph metrics, word widths and rendered lines.
+
+"""
+from __future__ import absolute_import, print_function, division
+from builtins import *
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import weakref
+from collections import OrderedDict
+
+
+# Maximal number of cached word widths and rendered lines per font
+_max_words = 20000
+_max_lines = 256
+
+
+class _FontMetrics(object):
+    """Cached metrics and rendered lines of a font."""
+
+    def __init__(self, font):
+        self.height = font.size("")[1]
+        self.advances = {}
+        self.words = {}
+        self.lines = OrderedDict()
+        self.space = self.word_width(font, " ")
+
+    def word_width(self, font, word):
+        """Return the width of a word (measured once)."""
+
+        try:
+            return self.words[word]
+        except KeyError:
+            if len(self.words) >= _max_words:
+                self.words = {}
+            width = font.size(word)[0]
+            self.words[word] = width
+            return width
+
+    def advance_sums(self, font, text):
+        """Return the cumulative glyph advances of a text."""
+
+        missing = [c for c in set(text) if c not in self.advances]
+        if len(missing) > 0:
+            for c, m in zip(missing, font.metrics("".join(missing))):
+                self.advances[c] = m[4] if m is not None else 0
+        sums = [0]
+        for c in text:
+            sums.append(sums[-1] + self.advances[c])
+        return sums
+
+
+_metrics = weakref.WeakKeyDictionary()
+
+
+def _get_metrics(font):
+    try:
+        return _metrics[font]
+    except KeyError:
+        metrics = _FontMetrics(font)
+        _metrics[font] = metrics
+        return metrics
+
+
+def get_line_height(font):
+    """Return the height of a line of text.
+
+    Parameters
+    ----------
+    font : pygame.font.Font
+        the font
+
+    Returns
+    -------
+    height : int
+
+    """
+
+    return _get_metrics(font).height
+
+
+def _trim_word(font, metrics, word, width):
+    """Return word[:k] + '~' with the largest k that fits into width."""
+
+    def fits(k):
+        return metrics.word_width(font, word[:k] + "~") < width
+
+    # estimate the length from the glyph advances and correct it
+    sums = metrics.advance_sums(font, word)
+    tilde = metrics.advance_sums(font, "~")[1]
+    k = max(len(word) - 2, 0)
+    while k > 0 and sums[k] + tilde >= width:
+        k -= 1
+    while k > 0 and not fits(k):
+        k -= 1
+    while k + 1 <= len(word) - 2 and fits(k + 1):
+        k += 1
+    return word[:k] + "~"
+
+
+def wrap_lines(text, font, width, trim_words=True):
+    """Word-wrap a text to fit a given width.
+
+    Each word is measured only once (widths are cached per font) and the
+    lines are filled greedily in one pass. Only lines whose estimated width
+    is close to the available width are measured as a whole. With bold or
+    italic fonts, every line is measured as a whole, since the width of
+    such a line is not the sum of the widths of its words.
+
+    Parameters
+    ----------
+    text : str
+        the text; '\\n' begins a new line
+    font : pygame.font.Font
+        the font
+    width : int
+        the available width
+    trim_words : bool, optional
+        if True, words too long for a line are trimmed (ending with '~'),
+        otherwise an exception is raised (default = True)
+
+    Returns
+    -------
+    lines : list of str
+
+    """
+
+    metrics = _get_metrics(font)
+    space = metrics.space
+    exact = font.get_bold() or font.get_italic()
+
+    def shorter(line, estimate, limit):
+        # word joins may be kerned, so lines close to the limit are measured
+        if exact:
+            return metrics.word_width(font, line) < limit
+        if estimate < limit - space:
+            return True
+        if estimate > limit + space:
+            return False
+        return metrics.word_width(font, line) < limit
+
+    final_lines = []
+    for requested_line in text.splitlines():
+        words = requested_line.split(' ')
+        widths = [metrics.word_width(font, word) for word in words]
+        estimate = sum(widths) + space * (len(words) - 1)
+        if shorter(requested_line, estimate, width + 1):
+            final_lines.append(requested_line)
+            continue
+
+        # Start a new line
+        accumulated_line = ""
+        accumulated_width = 0
+        for word, word_width in zip(words, widths):
+            if word_width >= width:
+                if trim_words:
+                    word = _trim_word(font, metrics, word, width)
+                    word_width = metrics.word_width(font, word)
+                else:
+                    raise Exception("The word " + word +
+                                    " is too long to fit in the rect passed.")
+
+            if len(accumulated_line) > 0:
+                test_line = accumulated_line + " " + word
+                test_width = accumulated_width + space + word_width
+            else:
+                test_line = word
+                test_width = word_width
+
+            # Build the line if the words fit.
+            if shorter(test_line, test_width, width):
+                accumulated_line = test_line
+                accumulated_width = test_width
+            else:
+                if len(accumulated_line) > 0:
+                    final_lines.append(accumulated_line)
+                accumulated_line = word
+                accumulated_width = word_width
+
+        final_lines.append(accumulated_line)
+    return final_lines
+
+
+def render_line(font, line, colour):
+    """Render a line of text.
+
+    Rendered lines are cached per font (and reused by all stimuli with the
+    same line).
+
+    Parameters
+    ----------
+    font : pygame.font.Font
+        the font
+    line : str
+        the line of text
+    colour : (int, int, int)
+        the text colour
+
+    Returns
+    -------
+    surface : pygame.Surface
+        the rendered line (shared; do not modify)
+
+    """
+
+    lines = _get_metrics(font).lines
+    key = (line, tuple(colour))
+    try:
+        surface = lines.pop(key)
+    except KeyError:
+        surface = font.render(line, 1, colour)
+        if len(lines) >= _max_lines:
+            lines.popitem(last=False)
+    lines[key] = surface
+    return surface
@@ -20,7 +20,6 @@ __revision__ = ''
 __date__ = ''
 
 
-import os
 import re
 
 import pygame
@@ -29,11 +28,8 @@ from . import defaults
 from .. import _internals
 from ..misc import find_font, unicode2byte, byte2unicode
 from ._visual import Visual
-
-
-# Keep track of open file handles and previously loaded font objects
-open_filehandles = []
-fonts = {}
+from ._font_cache import get_font_cache
+from ._text_layout import wrap_lines, render_line, get_line_height
 
 
 class TextBox(Visual):
@@ -113,10 +109,7 @@ class TextBox(Visual):
             self._text_font = find_font(text_font)
         else:
             self._text_font = find_font(_internals.active_exp.text_font)
-        try:
-            with open(self.text_font, 'rb') as f:
-                pygame.font.Font(f, 10)
-        except:
+        if not get_font_cache().validate(self.text_font):
             raise IOError("Font '{0}' not found!".format(text_font))
         if text_bold is not None:
             self._text_bold = text_bold
@@ -318,22 +311,9 @@ class TextBox(Visual):
 
         rect = pygame.Rect((0, 0), self.size)
 
-        if os.path.isfile(self._text_font):
-            # We preserve previously created fonts, so that we don't open the
-            # same font over and over again.
-            if (self._text_font, self._text_size) in fonts:
-                _font = fonts[(self._text_font, self._text_size)]
-            else:
-                f = open(self._text_font, 'rb')
-                open_filehandles.append(f)
-                _font = pygame.font.Font(f, self._text_size)
-                fonts[(self._text_font, self._text_size)] = _font
-        else:
-            _font = pygame.font.Font(self._text_font, self._text_size)
-
-        _font.set_bold(self.text_bold)
-        _font.set_italic(self.text_italic)
-        _font.set_underline(self.text_underline)
+        _font = get_font_cache().get_font(self._text_font, self._text_size,
+                                          self.text_bold, self.text_italic,
+                                          self.text_underline)
 
         if not _internals.is_unicode_string(self.text):
             # Pygame wants latin-1 encoding here for character strings
@@ -356,6 +336,9 @@ class TextBox(Visual):
         word-wrapping as necessary. The text will be anti-aliased.
         Returns a surface.
 
+        Word widths and rendered lines are cached per font, so that
+        layouting the same words again (e.g. in other text boxes) is fast.
+
         Parameters
         ----------
         string : str
@@ -373,54 +356,26 @@ class TextBox(Visual):
 
         """
 
-        final_lines = []
-        requested_lines = string.splitlines()
-
         # Create a series of lines that will fit on the provided
         # rect.
-        for requested_line in requested_lines:
-            if font.size(requested_line)[0] > rect.width:
-                # Start a new line
-                accumulated_line = ""
-                for word in requested_line.split(' '):
-                    if not self._do_not_trim_words:
-                        while font.size(word)[0] >= rect.width:
-                            word = word[:-2] + '~'
-                    elif font.size(word)[0] >= rect.width:
-                            raise Exception("The word " + word +
-                                " is too long to fit in the rect passed.")
-
-                    if len(accumulated_line) > 0:
-                        test_line = accumulated_line + " " + word
-                    else:
-                        test_line = word
-
-                    # Build the line if the words fit.
-                    if font.size(test_line)[0] < rect.width:
-                        accumulated_line = test_line
-                    else:
-                        if len(accumulated_line) > 0:
-                            final_lines.append(accumulated_line)
-                        accumulated_line = word
-
-                final_lines.append(accumulated_line)
-            else:
-                final_lines.append(requested_line)
+        final_lines = wrap_lines(string, font, rect.width,
+                                 trim_words=not self._do_not_trim_words)
 
         # Let's try to write the text out on the surface.
         surface = pygame.surface.Surface(rect.size,
                                          pygame.SRCALPHA).convert_alpha()
         if background_colour is not None:
             surface.fill(background_colour)
+        line_height = get_line_height(font)
         accumulated_height = 0
         for line in final_lines:
             # Changed from >= which led to crashes sometimes!
-            if accumulated_height + font.size(line)[1] > rect.height:
+            if accumulated_height + line_height > rect.height:
                 raise Exception(
                     "Once word-wrapped," +
                     "the text string was too tall to fit in the rect.")
             if line != "":
-                tempsurface = font.render(line, 1, text_colour)
+                tempsurface = render_line(font, line, text_colour)
                 if justification == 0:
                     surface.blit(tempsurface, (0, accumulated_height))
                 elif justification == 1:
@@ -434,7 +389,7 @@ class TextBox(Visual):
                 else:
                     raise Exception("Invalid justification argument: " +
                                     str(justification))
-            accumulated_height += font.size(line)[1]
+            accumulated_height += line_height
         return surface
 
     def format_block(self, block):
@@ -488,6 +443,70 @@ class TextBox(Visual):
         textbox.present()
         exp.clock.wait(1000)
 
+    @staticmethod
+    def _benchmark(n_words=5000, repetitions=3):
+        """Compare the layout time of a long text with a per-prefix layout.
+
+        The reference layout measures every growing prefix of each line (as
+        render_textrect did before word widths were cached).
+
+        """
+
+        import random
+        from .. import control
+        from ..misc._timer import get_time
+        control.set_develop_mode(True)
+        control.defaults.event_logging = 0
+        exp = control.initialize()
+        rnd = random.Random(1)
+        words = ["".join(rnd.choice("abcdefghijklmnopqrstuvwxyz")
+                         for _ in range(rnd.randint(1, 12)))
+                 for _ in range(n_words)]
+        text = " ".join(words)
+        width = 600
+        font = get_font_cache().get_font(find_font(exp.text_font),
+                                         exp.text_size)
+
+        def reference_layout():
+            final_lines = []
+            for requested_line in text.splitlines():
+                accumulated_line = ""
+                for word in requested_line.split(' '):
+                    while font.size(word)[0] >= width:
+                        word = word[:-2] + '~'
+                    if len(accumulated_line) > 0:
+                        test_line = accumulated_line + " " + word
+                    else:
+                        test_line = word
+                    if font.size(test_line)[0] < width:
+                        accumulated_line = test_line
+                    else:
+                        if len(accumulated_line) > 0:
+                            final_lines.append(accumulated_line)
+                        accumulated_line = word
+                final_lines.append(accumulated_line)
+            return final_lines
+
+        results = []
+        for name, layout in (("per-prefix", reference_layout),
+                             ("cached", lambda: wrap_lines(text, font,
+                                                           width))):
+            times = []
+            for _ in range(repetitions):
+                start = get_time()
+                lines = layout()
+                times.append((get_time() - start) * 1000)
+            results.append(lines)
+            print("{0:>10} layout of {1} words: first {2:.1f} ms, "
+                  "best {3:.1f} ms ({4} lines)".format(
+                      name, n_words, times[0], min(times), len(lines)))
+        print("identical lines: {0}".format(results[0] == results[1]))
+        control.end(fast_quit=True)
+
 
 if __name__ == "__main__":
-    TextBox._test()
+    import sys
+    if "--benchmark" in sys.argv:
+        TextBox._benchmark()
+    else:
+        TextBox._test()
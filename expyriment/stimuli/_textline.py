@@ -19,21 +19,16 @@ __version__ = ''
 __revision__ = ''
 __date__ = ''
 
-import os
 
 import pygame
 
 from . import defaults
 from ._visual import Visual
+from ._font_cache import get_font_cache
 from ..misc import find_font, unicode2byte, byte2unicode
 from .. import _internals
 
 
-# Keep track of open file handles and previously loaded font objects
-open_filehandles = []
-fonts = {}
-
-
 class TextLine(Visual):
     """A class implementing a single text line."""
 
@@ -95,10 +90,7 @@ class TextLine(Visual):
             self._text_font = find_font(text_font)
         else:
             self._text_font = find_font(_internals.active_exp.text_font)
-        try:
-            with open(self._text_font, 'rb') as f:
-                pygame.font.Font(f, 10)
-        except:
+        if not get_font_cache().validate(self._text_font):
             raise IOError("Font '{0}' not found!".format(text_font))
         if text_bold is not None:
             self._text_bold = text_bold
@@ -254,28 +246,65 @@ class TextLine(Visual):
         else:
             self._background_colour = value
 
-    def _create_surface(self):
-        """Create the surface of the stimulus."""
+    @classmethod
+    def prerender_many(cls, texts, preload=False, **style):
+        """Create and render text lines for many texts at once.
+
+        The font is looked up only once and each unique text is rendered
+        only once; text lines with the same text share their surface
+        (copy-on-write, as copies of a stimulus do). Rendering all words of
+        a design (e.g. of a lexical decision or Stroop task) before the
+        trial loop takes text rendering out of the trials.
+
+        Parameters
+        ----------
+        texts : list of str
+            the texts
+        preload : bool, optional
+            if True the text lines will be preloaded (in OpenGL mode, small
+            text lines are packed into the texture atlas; see
+            stimuli.defaults.visual_texture_atlas) (default = False)
+        **style
+            further parameters of the text lines (e.g. text_size or
+            text_colour)
+
+        Returns
+        -------
+        text_lines : list of stimuli.TextLine
+            one text line for each text (in the same order)
+
+        """
 
-        # Due to a bug in handling file names in PyGame 1.9.2, we pass a file
-        # handle to PyGame. See also:
-        # https://github.com/expyriment/expyriment/issues/81
-        if os.path.isfile(self._text_font):
-            # We preserve previously created fonts, so that we don't open the
-            # same font over and over again.
-            if (self._text_font, self._text_size) in fonts:
-                _font = fonts[(self._text_font, self._text_size)]
+        text_font = style.get("text_font")
+        if text_font is None:
+            text_font = defaults.textline_text_font
+        if text_font is None:
+            text_font = _internals.active_exp.text_font
+        style["text_font"] = find_font(text_font)
+        if not get_font_cache().validate(style["text_font"]):
+            raise IOError("Font '{0}' not found!".format(text_font))
+
+        rendered = {}
+        text_lines = []
+        for text in texts:
+            text_line = cls(text, **style)
+            if text in rendered:
+                text_line._share_surface(rendered[text])
             else:
-                f = open(self._text_font, 'rb')
-                open_filehandles.append(f)
-                _font = pygame.font.Font(f, self._text_size)
-                fonts[(self._text_font, self._text_size)] = _font
-        else:
-            _font = pygame.font.Font(self._text_font, self._text_size)
+                text_line._set_surface(text_line._create_surface())
+                rendered[text] = text_line
+            text_lines.append(text_line)
+        if preload:
+            for text_line in text_lines:
+                text_line.preload()
+        return text_lines
+
+    def _create_surface(self):
+        """Create the surface of the stimulus."""
 
-        _font.set_bold(self.text_bold)
-        _font.set_italic(self.text_italic)
-        _font.set_underline(self.text_underline)
+        _font = get_font_cache().get_font(self._text_font, self._text_size,
+                                          self.text_bold, self.text_italic,
+                                          self.text_underline)
         if not _internals.is_unicode_string(self.text):
             # Pygame wants latin-1 encoding here for character strings
             _text = byte2unicode(self.text).encode('latin-1')
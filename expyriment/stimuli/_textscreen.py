@@ -25,6 +25,7 @@ import pygame
 from . import defaults
 from ._stimulus import Stimulus
 from ._visual import Visual
+from ._font_cache import get_font_cache
 from ._textline import TextLine
 from ._textbox import TextBox
 from ..misc import find_font, unicode2byte
@@ -94,10 +95,7 @@ class TextScreen(Visual):
             self._heading_font = find_font(heading_font)
         else:
             self._heading_font = find_font(_internals.active_exp.text_font)
-        try:
-            with open(self._heading_font, 'rb') as f:
-                pygame.font.Font(f, 10)
-        except:
+        if not get_font_cache().validate(self._heading_font):
             raise IOError("Font '{0}' not found!".format(heading_font))
         if heading_size is None:
             heading_size = defaults.textscreen_heading_size
@@ -132,10 +130,7 @@ class TextScreen(Visual):
             self._text_font = find_font(text_font)
         else:
             self._text_font = find_font(_internals.active_exp.text_font)
-        try:
-            with open(self._text_font, 'rb') as f:
-                pygame.font.Font(f, 10)
-        except:
+        if not get_font_cache().validate(self._text_font):
             raise IOError("Font '{0}' not found!".format(text_font))
         if text_size is None:
             self._text_size = defaults.textscreen_text_size
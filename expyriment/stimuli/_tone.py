@@ -21,21 +21,119 @@ import os
 import math
 import wave
 import struct
-import itertools
 import tempfile
 import shutil
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from . import defaults
 from ._audio import Audio
 
 
+def _apply_ramp(samples, n_ramp):
+    """Fade the samples in and out with linear ramps.
+
+    Parameters
+    ----------
+    samples : numpy.ndarray or list of float
+        samples of one channel
+    n_ramp : int
+        number of samples of each ramp
+
+    Returns
+    -------
+    samples : numpy.ndarray or list of float
+
+    """
+
+    n_ramp = min(int(n_ramp), len(samples) // 2)
+    if n_ramp <= 0:
+        return samples
+    if np is not None:
+        ramp = np.arange(n_ramp) / float(n_ramp)
+        samples = np.asarray(samples, dtype=float)
+        samples[:n_ramp] *= ramp
+        samples[len(samples) - n_ramp:] *= ramp[::-1]
+    else:
+        samples = list(samples)
+        for i in range(n_ramp):
+            factor = i / float(n_ramp)
+            samples[i] *= factor
+            samples[len(samples) - 1 - i] *= factor
+    return samples
+
+
+def _write_wave(filename, samples, samplerate, bitdepth, channels=1):
+    """Write samples to a WAV file with one writeframes call.
+
+    Parameters
+    ----------
+    filename : str
+        name of the file
+    samples : numpy.ndarray or list of float
+        samples between -1 and 1; an array (n_samples, n_channels) for
+        different channels
+    samplerate : int
+        samplerate
+    bitdepth : int
+        bitdepth (8, 16, 24 or 32)
+    channels : int, optional
+        number of channels the samples of one channel are written to
+        (default = 1)
+
+    """
+
+    if bitdepth not in (8, 16, 24, 32):
+        raise ValueError("Bitdepth has to be 8, 16, 24 or 32!")
+    max_amplitude = float(int((2 ** bitdepth) / 2) - 1)
+    if np is not None:
+        samples = np.asarray(samples, dtype=float)
+        if samples.ndim == 1 and channels > 1:
+            samples = np.repeat(samples[:, None], channels, axis=1)
+        n_channels = 1 if samples.ndim == 1 else samples.shape[1]
+        values = (np.clip(samples, -1, 1) * max_amplitude).astype(np.int32)
+        if bitdepth == 8:
+            frames = (values + 128).astype(np.uint8).tobytes()
+        elif bitdepth == 16:
+            frames = values.astype('<i2').tobytes()
+        elif bitdepth == 24:
+            frames = values.astype('<i4').view(np.uint8).reshape(
+                -1, 4)[:, :3].tobytes()
+        else:
+            frames = values.astype('<i4').tobytes()
+    else:
+        n_channels = channels
+        values = [int(min(max(x, -1), 1) * max_amplitude) for x in samples
+                  for _ in range(channels)]
+        if bitdepth == 8:
+            frames = struct.pack("<{0}B".format(len(values)),
+                                 *[x + 128 for x in values])
+        elif bitdepth == 16:
+            frames = struct.pack("<{0}h".format(len(values)), *values)
+        elif bitdepth == 24:
+            frames = struct.pack("<{0}i".format(len(values)), *values)
+            frames = b"".join(frames[i:i + 3]
+                              for i in range(0, len(frames), 4))
+        else:
+            frames = struct.pack("<{0}i".format(len(values)), *values)
+    w = wave.open(filename, 'w')
+    w.setparams((n_channels, bitdepth // 8, samplerate,
+                 len(frames) // (n_channels * bitdepth // 8), 'NONE',
+                 'not compressed'))
+    w.writeframes(frames)
+    w.close()
+
+
 class Tone(Audio):
     """A class implementing a tone stimulus."""
 
     _getter_exception_message = "Cannot set {0} if preloaded!"
 
     def __init__(self, duration, frequency=None, samplerate=None,
-                 bitdepth=None, amplitude=None):
+                 bitdepth=None, amplitude=None, ramp=None, channels=None):
         """Create a Tone.
 
         Parameters
@@ -50,6 +148,10 @@ class Tone(Audio):
             bitdeth of the sine tone
         amplitude : int, optional
             amplitude of the sine tone
+        ramp : int, optional
+            duration of the linear fade-in and fade-out in ms
+        channels : int, optional
+            number of channels (all with the same sine tone)
 
         """
 
@@ -66,6 +168,12 @@ class Tone(Audio):
         if amplitude is None:
             amplitude = defaults.tone_amplitude
         self._amplitude = amplitude
+        if ramp is None:
+            ramp = defaults.tone_ramp
+        self._ramp = ramp
+        if channels is None:
+            channels = defaults.tone_channels
+        self._channels = channels
         filename = self._create_sine_wave()
         Audio.__init__(self, filename)
 
@@ -155,41 +263,60 @@ class Tone(Audio):
             self._amplitude = value
             self._filename = self._create_sine_wave()
 
-    def _grouper(self, n, iterable, fillvalue=None):
-        """Write in chunks."""
+    @property
+    def ramp(self):
+        """Getter for ramp."""
+
+        return self._ramp
+
+    @ramp.setter
+    def ramp(self, value):
+        """Setter for ramp."""
+
+        if self.is_preloaded:
+            raise AttributeError(Audio._getter_exception_message.format(
+                "ramp"))
+        else:
+            self._ramp = value
+            self._filename = self._create_sine_wave()
+
+    @property
+    def channels(self):
+        """Getter for channels."""
+
+        return self._channels
 
-        args = [iter(iterable)] * n
-        return itertools.zip_longest(fillvalue=fillvalue, *args)
+    @channels.setter
+    def channels(self, value):
+        """Setter for channels."""
+
+        if self.is_preloaded:
+            raise AttributeError(Audio._getter_exception_message.format(
+                "channels"))
+        else:
+            self._channels = value
+            self._filename = self._create_sine_wave()
 
     def _create_sine_wave(self):
         """Create the sine wave."""
 
-        period = int(self._samplerate / self._frequency)
-        lookup_table = [float(self._amplitude) * \
-                        math.sin(2.0 * math.pi * float(self._frequency) * \
-                                 (float(i % period) / float(self._samplerate))) \
-                        for i in range(period)]
-        sine = (lookup_table[i % period] for i in itertools.count(0))
-        channels = ((sine,),)
         n_samples = int(self._duration * self._samplerate)
-        samples = itertools.islice(zip(
-            *(map(sum, zip(*channel)) \
-              for channel in channels)), n_samples)
+        step = 2.0 * math.pi * float(self._frequency) / self._samplerate
+        if np is not None:
+            samples = float(self._amplitude) * np.sin(np.arange(n_samples) *
+                                                      step)
+        else:
+            samples = [float(self._amplitude) * math.sin(i * step)
+                       for i in range(n_samples)]
+        samples = _apply_ramp(samples,
+                              self._ramp / 1000.0 * self._samplerate)
         fid, filename = tempfile.mkstemp(dir=defaults.tempdir,
                         prefix="freq{0}_dur{1}_".format(self.frequency,
                                                        self.duration),
                         suffix=".wav")
         os.close(fid)
-        w = wave.open(filename, 'w')
-        w.setparams((1, self._bitdepth // 8, self._samplerate, n_samples, 'NONE',
-                     'not compressed'))
-        max_amplitude = float(int((2 ** (self._bitdepth)) / 2) - 1)
-        for chunk in self._grouper(2048, samples):
-            frames = b''.join(b''.join(struct.pack(
-                b'h', int(max_amplitude * sample)) for sample in channels) \
-                for channels in chunk if channels is not None)
-            w.writeframesraw(frames)
-        w.close()
+        _write_wave(filename, samples, self._samplerate, self._bitdepth,
+                    self._channels)
         return filename
 
     def save(self, filename):
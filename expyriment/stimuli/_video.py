@@ -495,9 +495,10 @@ class Video(_visual.Stimulus):
         start = Clock.monotonic_time()
         self._surface_locked = True
         if not _internals.active_exp._screen.open_gl:
-            _internals.active_exp._screen.surface.blit(
+            rect = _internals.active_exp._screen.surface.blit(
                 pygame.surfarray.make_surface(self._surface.swapaxes(0,1)),
                 self._pos)
+            _internals.active_exp._screen.mark_dirty(rect)
             self._surface_locked = False
             self._new_frame_available = False
         else:
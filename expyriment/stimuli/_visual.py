@@ -14,10 +14,20 @@ __date__ = ''
 
 import tempfile
 import os
+import sys
+import atexit
 import copy
 import random
+import zlib
+import mmap
+from hashlib import md5
+from collections import OrderedDict
 
 import pygame
+try:
+    import numpy as np
+except ImportError:
+    np = None
 try:
     import OpenGL.GLU as oglu
     import OpenGL.GL as ogl
@@ -34,6 +44,715 @@ from ..misc._timer import get_time
 random.seed()
 
 
+class _TextureAtlas(object):
+    """A class implementing an atlas of small textures.
+
+    Small surfaces are packed into shared large textures (pages) with a
+    shelf packing algorithm: each region is put on the lowest fitting shelf
+    (row) of a page, or on a new shelf below the others. Each region is
+    surrounded by transparent padding. Regions cannot be freed individually;
+    a page is cleared as soon as all its regions are freed.
+
+    """
+
+    _padding = 1  # empty texels on each side of a region to avoid bleeding
+
+    def __init__(self):
+        """Create a texture atlas."""
+
+        self._pages = []  # [texture, size, shelves, number of regions]
+
+    @property
+    def pages(self):
+        """Getter for pages (number of atlas textures)."""
+
+        return len(self._pages)
+
+    @property
+    def nbytes(self):
+        """Getter for nbytes (video memory of all pages)."""
+
+        return sum([page[1] * page[1] * 4 for page in self._pages])
+
+    def fits(self, width, height):
+        """Check if a surface is small enough to be packed into the atlas.
+
+        Parameters
+        ----------
+        width : int
+        height : int
+
+        Returns
+        -------
+        out : bool
+
+        """
+
+        max_size = defaults.visual_texture_atlas_max_stimulus_size
+        return 0 < width <= max_size and 0 < height <= max_size
+
+    def insert(self, texture_data, new_page=True):
+        """Insert pixel data into the atlas.
+
+        Parameters
+        ----------
+        texture_data : tuple
+            pixel data as returned by Visual._texture_data
+        new_page : bool, optional
+            create a new page if the data does not fit into the existing
+            pages (default = True)
+
+        Returns
+        -------
+        region : (list, (int, int, int, int), tuple) or None
+            the page, the rectangle (x, y, width, height) and the texture
+            coordinates of the region; None, if there is no space left
+
+        """
+
+        width, height = texture_data[3:5]
+        for page in self._pages:
+            rect = self._allocate(page, width, height)
+            if rect is not None:
+                break
+        else:
+            if not new_page or \
+                    len(self._pages) >= defaults.visual_texture_atlas_pages:
+                return None
+            page = self._new_page()
+            rect = self._allocate(page, width, height)
+            if rect is None:
+                return None
+
+        data, colours, data_format, width, height, row_length = texture_data
+        ogl.glBindTexture(ogl.GL_TEXTURE_2D, page[0])
+        ogl.glPixelStorei(ogl.GL_UNPACK_ALIGNMENT, 1)
+        ogl.glPixelStorei(ogl.GL_UNPACK_ROW_LENGTH, row_length)
+        ogl.glTexSubImage2D(ogl.GL_TEXTURE_2D, 0, rect[0], rect[1],
+                            width, height, data_format, ogl.GL_UNSIGNED_BYTE,
+                            data)
+        ogl.glPixelStorei(ogl.GL_UNPACK_ROW_LENGTH, 0)
+        ogl.glPixelStorei(ogl.GL_UNPACK_ALIGNMENT, 4)
+        page[3] += 1
+        size = float(page[1])
+        left, top = rect[0] / size, rect[1] / size
+        right, bottom = (rect[0] + width) / size, (rect[1] + height) / size
+        texcoords = ((left, top), (right, top), (right, bottom),
+                     (left, bottom))
+        return page, rect, texcoords
+
+    def free(self, region):
+        """Free a region of the atlas.
+
+        Parameters
+        ----------
+        region : tuple
+            the region as returned by insert
+
+        """
+
+        page = region[0]
+        page[3] -= 1
+        if page[3] <= 0 and any(p is page for p in self._pages):
+            page[2] = []
+            page[3] = 0
+            self._zero_fill(page)
+
+    def delete_empty_pages(self):
+        """Delete the textures of all pages without regions.
+
+        Returns
+        -------
+        n_pages : int
+            the number of deleted pages
+
+        """
+
+        empty = [page for page in self._pages if page[3] <= 0]
+        for page in empty:
+            self._pages.remove(page)
+            try:
+                ogl.glDeleteTextures([page[0]])
+            except:
+                pass
+        return len(empty)
+
+    def clear(self):
+        """Forget all pages.
+
+        This has to be called whenever the OpenGL context changes.
+
+        """
+
+        self._pages = []
+
+    def _new_page(self):
+        """Create a new empty page."""
+
+        size = defaults.visual_texture_atlas_size
+        texture = ogl.glGenTextures(1)
+        ogl.glEnable(ogl.GL_TEXTURE_2D)
+        ogl.glBindTexture(ogl.GL_TEXTURE_2D, texture)
+        # Uninitialised texture memory is undefined, so pages start
+        # transparent (the padding around regions relies on it)
+        ogl.glTexImage2D(ogl.GL_TEXTURE_2D, 0, ogl.GL_RGBA, size, size, 0,
+                         ogl.GL_RGBA, ogl.GL_UNSIGNED_BYTE,
+                         b"\x00" * (size * size * 4))
+        ogl.glTexParameterf(ogl.GL_TEXTURE_2D,
+                            ogl.GL_TEXTURE_MAG_FILTER,
+                            ogl.GL_NEAREST)
+        ogl.glTexParameterf(ogl.GL_TEXTURE_2D,
+                            ogl.GL_TEXTURE_MIN_FILTER,
+                            ogl.GL_NEAREST)
+        ogl.glTexParameterf(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_WRAP_S,
+                            ogl.GL_CLAMP_TO_EDGE)
+        ogl.glTexParameterf(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_WRAP_T,
+                            ogl.GL_CLAMP_TO_EDGE)
+        ogl.glDisable(ogl.GL_TEXTURE_2D)
+        page = [texture, size, [], 0]
+        self._pages.append(page)
+        return page
+
+    def _zero_fill(self, page):
+        """Make a whole page transparent again."""
+
+        size = page[1]
+        ogl.glBindTexture(ogl.GL_TEXTURE_2D, page[0])
+        ogl.glPixelStorei(ogl.GL_UNPACK_ALIGNMENT, 1)
+        ogl.glTexSubImage2D(ogl.GL_TEXTURE_2D, 0, 0, 0, size, size,
+                            ogl.GL_RGBA, ogl.GL_UNSIGNED_BYTE,
+                            b"\x00" * (size * size * 4))
+        ogl.glPixelStorei(ogl.GL_UNPACK_ALIGNMENT, 4)
+
+    def _allocate(self, page, width, height):
+        """Find space for a rectangle on a page.
+
+        Returns (x, y, width, height) or None.
+
+        """
+
+        size = page[1]
+        shelves = page[2]  # [y, height, next free x]
+        width = width + 2 * self._padding
+        height = height + 2 * self._padding
+        best = None
+        for shelf in shelves:
+            if shelf[1] >= height and shelf[2] + width <= size:
+                if best is None or shelf[1] < best[1]:
+                    best = shelf
+        if best is None:
+            if len(shelves) > 0:
+                y = shelves[-1][0] + shelves[-1][1]
+            else:
+                y = 0
+            if y + height > size or width > size:
+                return None
+            best = [y, height, 0]
+            shelves.append(best)
+        x = best[2]
+        best[2] += width
+        return (x + self._padding, best[0] + self._padding,
+                width - 2 * self._padding, height - 2 * self._padding)
+
+
+class _TextureCache(object):
+    """A class implementing a content-addressed cache of OpenGL textures.
+
+    Surfaces with identical pixel data share one texture. Textures are
+    reference counted and are only deleted if they are not used anymore and
+    the cache exceeds its size limit (least recently used ones first).
+    Small surfaces are packed into a texture atlas (see _TextureAtlas); the
+    atlas pages count towards the size limit as a whole.
+
+    """
+
+    def __init__(self):
+        """Create a texture cache."""
+
+        self._entries = OrderedDict()  # key: [texture, users, bytes, region]
+        self._atlas = _TextureAtlas()
+        self._size = 0
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self):
+        """Getter for size (in bytes) of all cached textures."""
+
+        return self._size + self._atlas.nbytes
+
+    @property
+    def atlas(self):
+        """Getter for atlas."""
+
+        return self._atlas
+
+    def acquire(self, surface):
+        """Get a texture for a surface.
+
+        Parameters
+        ----------
+        surface : pygame.Surface or numpy.array object
+            surface to get a texture for
+
+        Returns
+        -------
+        key : tuple
+            the key to release the texture with
+        texture : int
+            the OpenGL texture
+        texcoords : tuple or None
+            texture coordinates of the corners (top left, top right, bottom
+            right, bottom left), if the surface is part of an atlas texture
+
+        """
+
+        texture_data = Visual._texture_data(surface)
+        data = texture_data[0]
+        key = (self._generation, md5(data).digest()) + texture_data[1:]
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            region = None
+            if defaults.visual_texture_atlas and \
+                    isinstance(surface, pygame.Surface) and \
+                    self._atlas.fits(*texture_data[3:5]):
+                region = self._atlas.insert(texture_data, new_page=False)
+                if region is None:
+                    self._evict_atlas()
+                    region = self._atlas.insert(texture_data)
+            if region is not None:
+                # the page is accounted for by the atlas
+                entry = [region[0][0], 0, 0, region]
+            else:
+                entry = [Visual._upload_texture(*texture_data), 0,
+                         memoryview(data).nbytes, None]
+            self._size += entry[2]
+        else:
+            self.hits += 1
+        entry[1] += 1
+        self._entries[key] = entry
+        self._evict()
+        if entry[3] is not None:
+            return key, entry[0], entry[3][2]
+        else:
+            return key, entry[0], None
+
+    def retain(self, key):
+        """Add a user to an acquired texture.
+
+        Parameters
+        ----------
+        key : tuple
+            the key returned by acquire
+
+        """
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[1] += 1
+
+    def release(self, key):
+        """Release a texture.
+
+        Parameters
+        ----------
+        key : tuple
+            the key returned by acquire
+
+        """
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[1] -= 1
+            self._evict()
+
+    def clear(self):
+        """Forget all textures.
+
+        This has to be called whenever the OpenGL context changes, since
+        textures of the old context are invalid.
+
+        """
+
+        self._entries.clear()
+        self._atlas.clear()
+        self._size = 0
+        self._generation += 1
+
+    def _remove(self, key):
+        """Remove an entry and delete its texture or atlas region."""
+
+        texture, users, nbytes, region = self._entries.pop(key)
+        self._size -= nbytes
+        if region is not None:
+            self._atlas.free(region)
+        else:
+            try:
+                ogl.glDeleteTextures([texture])
+            except:
+                pass
+
+    def _evict(self):
+        """Delete unused textures until the cache fits into its size limit."""
+
+        if defaults.visual_texture_cache_size is None:
+            return
+        limit = defaults.visual_texture_cache_size * 1024 * 1024
+        for key in list(self._entries.keys()):
+            if self.size <= limit:
+                break
+            if self._entries[key][1] <= 0:
+                self._remove(key)
+        if self.size > limit:
+            self._atlas.delete_empty_pages()
+
+    def _evict_atlas(self):
+        """Delete all unused atlas regions to make space in the atlas."""
+
+        for key in list(self._entries.keys()):
+            entry = self._entries[key]
+            if entry[3] is not None and entry[1] <= 0:
+                self._remove(key)
+
+
+_texture_cache = _TextureCache()
+
+
+class _CompressedSurfaceStore(object):
+    """A class implementing an in-memory store of compressed surfaces.
+
+    The raw pixel data of surfaces is compressed with zlib and kept in
+    memory. If the store exceeds its memory limit, further data is spilled
+    into a memory-mapped file in the temporary directory. The spill file is
+    emptied as soon as all spilled surfaces have been removed, and it is
+    deleted at exit.
+
+    """
+
+    def __init__(self):
+        """Create a compressed surface store."""
+
+        self._memory = 0
+        self._spill_file = None
+        self._spill_size = 0
+        self._spill_map = None
+        self._n_spilled = 0  # handles referring to the spill file
+        atexit.register(self.close)
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.compression_time = 0.0
+        self.decompression_time = 0.0
+
+    @property
+    def memory(self):
+        """Getter for memory (in bytes) of data kept in memory."""
+
+        return self._memory
+
+    @property
+    def ratio(self):
+        """Getter for the overall compression ratio (raw / compressed)."""
+
+        if self.compressed_bytes == 0:
+            return None
+        return self.raw_bytes / float(self.compressed_bytes)
+
+    def put(self, surface):
+        """Compress a surface and store it.
+
+        Parameters
+        ----------
+        surface : pygame.Surface
+            the surface to store
+
+        Returns
+        -------
+        handle : tuple
+            the handle to get the surface back with
+
+        """
+
+        start = get_time()
+        raw = pygame.image.tostring(surface, "RGBA")
+        data = zlib.compress(raw, defaults.visual_compression_level)
+        limit = defaults.visual_compression_memory_limit
+        if limit is not None and \
+                self._memory + len(data) > limit * 1024 * 1024:
+            location = self._spill(data)
+        else:
+            location = data
+            self._memory += len(data)
+        self.raw_bytes += len(raw)
+        self.compressed_bytes += len(data)
+        self.compression_time += get_time() - start
+        return (location, len(data), surface.get_size(), len(raw))
+
+    def get(self, handle):
+        """Get a stored surface.
+
+        Parameters
+        ----------
+        handle : tuple
+            the handle returned by put
+
+        Returns
+        -------
+        surface : pygame.Surface
+
+        """
+
+        start = get_time()
+        location, length, size, raw_length = handle
+        if isinstance(location, int):
+            if self._spill_map is None or \
+                    len(self._spill_map) < location + length:
+                self._remap()
+            data = self._spill_map[location:location + length]
+        else:
+            data = location
+        surface = pygame.image.fromstring(zlib.decompress(data), size,
+                                          "RGBA").convert_alpha()
+        self.decompression_time += get_time() - start
+        return surface
+
+    def share(self, handle):
+        """Share a stored surface with another stimulus.
+
+        Each stimulus sharing the data has to remove it separately.
+
+        Parameters
+        ----------
+        handle : tuple
+            the handle returned by put
+
+        Returns
+        -------
+        handle : tuple
+            the handle for the other stimulus
+
+        """
+
+        location, length, size, raw_length = handle
+        if isinstance(location, int):
+            self._n_spilled += 1
+        else:
+            self._memory += length
+        self.raw_bytes += raw_length
+        self.compressed_bytes += length
+        return handle
+
+    def remove(self, handle):
+        """Remove a stored surface.
+
+        Parameters
+        ----------
+        handle : tuple
+            the handle returned by put
+
+        """
+
+        location, length, size, raw_length = handle
+        if isinstance(location, int):
+            self._n_spilled -= 1
+            if self._n_spilled <= 0:
+                self._truncate()
+        else:
+            self._memory -= length
+        self.raw_bytes -= raw_length
+        self.compressed_bytes -= length
+
+    def close(self):
+        """Close and delete the spill file.
+
+        Surfaces in the spill file cannot be loaded anymore afterwards.
+
+        """
+
+        if self._spill_map is not None:
+            self._spill_map.close()
+            self._spill_map = None
+        if self._spill_file is not None:
+            filename = self._spill_file.name
+            self._spill_file.close()
+            self._spill_file = None
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+        self._spill_size = 0
+        self._n_spilled = 0
+
+    def _spill(self, data):
+        """Append data to the spill file and return its offset."""
+
+        if self._spill_file is None:
+            fid, filename = tempfile.mkstemp(dir=defaults.tempdir,
+                                             suffix=".spill")
+            os.close(fid)
+            self._spill_file = open(filename, "w+b")
+        self._n_spilled += 1
+        offset = self._spill_size
+        self._spill_file.seek(offset)
+        self._spill_file.write(data)
+        self._spill_file.flush()
+        self._spill_size += len(data)
+        return offset
+
+    def _remap(self):
+        """Memory-map the spill file (again)."""
+
+        if self._spill_map is not None:
+            self._spill_map.close()
+        self._spill_map = mmap.mmap(self._spill_file.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+
+    def _truncate(self):
+        """Empty the spill file (if no handle refers to it anymore)."""
+
+        if self._spill_file is None or self._spill_size == 0:
+            return
+        if self._spill_map is not None:
+            self._spill_map.close()
+            self._spill_map = None
+        self._spill_file.seek(0)
+        self._spill_file.truncate()
+        self._spill_size = 0
+        self._n_spilled = 0
+
+
+_compression_store = _CompressedSurfaceStore()
+
+
+def _get_box_radii(sigma, n=3):
+    """Return the radii of n box filters approximating a Gaussian filter.
+
+    See Kutskir, I. (2013). Fastest Gaussian blur (in linear time).
+
+    """
+
+    lower = int((12.0 * sigma ** 2 / n + 1) ** 0.5)
+    if lower % 2 == 0:
+        lower -= 1
+    n_lower = int(round((12.0 * sigma ** 2 - n * lower ** 2 - 4 * n * lower -
+                         3 * n) / (-4.0 * lower - 4)))
+    sizes = [lower] * n_lower + [lower + 2] * (n - n_lower)
+    return [(x - 1) // 2 for x in sizes]
+
+
+def _extend_borders(data, radius, axis):
+    """Return data extended by radius border values on both sides."""
+
+    n = data.shape[axis]
+    return np.concatenate((np.repeat(data.take([0], axis=axis), radius,
+                                     axis=axis),
+                           data,
+                           np.repeat(data.take([n - 1], axis=axis), radius,
+                                     axis=axis)), axis=axis)
+
+
+def _part(array, start, stop, axis):
+    """Return a slice of an array along one axis."""
+
+    index = [slice(None)] * array.ndim
+    index[axis] = slice(start, stop)
+    return array[tuple(index)]
+
+
+def _gaussian_filter(data, sigma, axis):
+    """Apply a (short) Gaussian filter in place along one axis."""
+
+    radius = max(1, int(np.ceil(3 * sigma)))
+    x = np.arange(-radius, radius + 1, dtype=np.float32)
+    kernel = np.exp(-x ** 2 / (2.0 * sigma ** 2))
+    kernel /= kernel.sum()
+    n = data.shape[axis]
+    block = _extend_borders(data, radius, axis)
+    np.multiply(_part(block, 0, n, axis), kernel[0], out=data)
+    for i in range(1, len(kernel)):
+        data += _part(block, i, i + n, axis) * kernel[i]
+
+
+def _box_filter(data, radius, axis):
+    """Apply a box filter in place along one axis (with extended borders).
+
+    The window sums are built from sums of doubling width (1, 2, 4, ...),
+    so that a radius r needs only about 2 * log2(2r + 1) array additions.
+
+    """
+
+    n = data.shape[axis]
+    width = 2 * radius + 1
+    block = _extend_borders(data, radius, axis)
+    step = 1  # current width of the sums in block
+    offset = 0
+    while step <= width:
+        if width & step:
+            if offset > 0:
+                data += _part(block, offset, offset + n, axis)
+            else:
+                data[...] = _part(block, offset, offset + n, axis)
+            offset += step
+        if step * 2 <= width:
+            length = block.shape[axis]
+            block = _part(block, 0, length - step, axis) + \
+                    _part(block, step, length, axis)
+        step *= 2
+    data *= 1.0 / width
+
+
+def _blur_surface(surface, mode, level):
+    """Blur a surface in place with separable filters.
+
+    A Gaussian blur is approximated by three successive box filters, unless
+    its standard deviation is too small for that (< 2 pixels). Colours are
+    premultiplied with alpha, so that transparent pixels do not bleed into
+    the visible ones. Borders are extended.
+
+    Parameters
+    ----------
+    surface : pygame.Surface
+        32 bit surface with per-pixel alpha
+    mode : str
+        'gaussian' (level is the standard deviation) or 'box' (level is the
+        radius)
+    level : int or float
+
+    """
+
+    rgb = pygame.surfarray.pixels3d(surface)
+    has_alpha = surface.get_masks()[3] != 0
+    # (channel, y, x) float layout, so that the rows are contiguous
+    data = np.empty((4,) + rgb.shape[1::-1], dtype=np.float32)
+    data[:3] = rgb.transpose(2, 1, 0)
+    if has_alpha:
+        alpha = pygame.surfarray.pixels_alpha(surface)
+        data[3] = alpha.T
+        data[:3] *= data[3] * (1 / 255.0)
+    else:
+        data[3] = 255
+    for axis in (2, 1):
+        if mode == "box":
+            _box_filter(data, int(level), axis)
+        elif level < 2:
+            _gaussian_filter(data, level, axis)
+        else:
+            for radius in _get_box_radii(level):
+                _box_filter(data, radius, axis)
+    if has_alpha:
+        factor = np.zeros_like(data[3])
+        np.divide(255.0, data[3], out=factor, where=data[3] > 0)
+        data[:3] *= factor
+    data += 0.5
+    np.clip(data, 0, 255, out=data)
+    if has_alpha:
+        alpha[...] = data[3].T
+        del alpha
+    rgb[...] = data[:3].transpose(2, 1, 0)
+    del rgb
+
+
 class _LaminaPanelSurface(object):
     """A class implementing an OpenGL surface."""
 
@@ -41,7 +760,7 @@ class _LaminaPanelSurface(object):
     # (http://pitchersduel.python-hosting.com/file/branches/Lamina/lamina.py)
     # with some modifications to fit it into expyriment (e.g. positioning)
     def __init__(self, surface, quadDims=(-1, 1, 1, 1),
-                 position=(0, 0)):
+                 position=(0, 0), texture_cache=None):
         """Initialize new instance.
 
         Parameters
@@ -50,11 +769,27 @@ class _LaminaPanelSurface(object):
             pygame surface to convert
         quadDims : (int,int), optional
         position : (int,int), optional
+        texture_cache : _TextureCache, optional
+            cache to share the texture with identical surfaces
 
         """
 
-        self._txtr = Visual._load_texture(surface)
-        if isinstance(surface, pygame.Surface):
+        self._texture_cache = texture_cache
+        texcoords = None
+        if texture_cache is not None:
+            self._cache_key, self._txtr, texcoords = \
+                                        texture_cache.acquire(surface)
+        else:
+            self._txtr = Visual._load_texture(surface)
+        # Textures of pygame surfaces are uploaded top row first
+        self._top_down = isinstance(surface, pygame.Surface)
+        if texcoords is not None:
+            self._texcoords = texcoords
+        elif self._top_down:
+            self._texcoords = ((0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0))
+        else:
+            self._texcoords = ((0.0, 1.0), (1.0, 1.0), (1.0, 0.0), (0.0, 0.0))
+        if self._top_down:
             self._winsize = surface.get_size()
         else:
             self._winsize = (len(surface[0]), len(surface))
@@ -70,11 +805,35 @@ class _LaminaPanelSurface(object):
         """Call glDeleteTextures when deconstruction the object."""
 
         if getattr(self, '_txtr', None) is not None:
+            if getattr(self, '_texture_cache', None) is not None:
+                self._texture_cache.release(self._cache_key)
+                return
             try:
                 ogl.glDeleteTextures([self._txtr])
             except:
                 pass
 
+    def copy(self, position):
+        """Return a panel sharing the texture of this one.
+
+        Sharing is only possible for textures from a texture cache. Otherwise
+        None is returned.
+
+        Parameters
+        ----------
+        position : (int, int)
+            position of the new panel
+
+        """
+
+        if self._texture_cache is None:
+            return None
+        self._texture_cache.retain(self._cache_key)
+        rtn = copy.copy(self)
+        rtn._position = position
+        rtn.refresh_position()
+        return rtn
+
     def convertMousePos(self, pos):
         """Convert 2d pixel mouse pos to 2d gl units.
 
@@ -91,39 +850,53 @@ class _LaminaPanelSurface(object):
         return x, y
 
     def refresh_position(self):
-        """Recalc where in modelspace quad needs to be to fill screen."""
+        """Recalc where in modelspace quad needs to be to fill screen.
+
+        The mapping of window to model coordinates is taken from the screen,
+        where it is computed only once. No texture is uploaded again.
+
+        """
 
         screensize = pygame.display.get_surface().get_size()
-        bottomleft = oglu.gluUnProject(screensize[0] // 2 - \
-                                       self._winsize[0] // 2 + \
-                                       self._position[0],
-                                       screensize[1] // 2 - \
-                                       int(round(self._winsize[1] / 2.0)) + \
-                                       self._position[1], 0)
-        bottomright = oglu.gluUnProject(screensize[0] // 2 + \
-                                        int(round(self._winsize[0] / 2.0)) + \
-                                        self._position[0],
-                                        screensize[1] // 2 - \
-                                        int(round(self._winsize[1] / 2.0)) + \
-                                        self._position[1], 0)
-        topleft = oglu.gluUnProject(screensize[0] // 2 - \
-                                    self._winsize[0] // 2 + \
-                                    self._position[0],
-                                    screensize[1] // 2 + \
-                                    self._winsize[1] // 2 + \
-                                    self._position[1], 0)
-        topright = oglu.gluUnProject(screensize[0] // 2 + \
-                                     int(round(self._winsize[0] / 2.0)) + \
-                                     self._position[0],
-                                     screensize[1] // 2 + \
-                                     self._winsize[1] // 2 + \
-                                     self._position[1], 0)
+        origin, x_axis, y_axis = \
+                        _internals.active_exp.screen._ogl_unprojection
+
+        def unproject(x, y):
+            return (origin[0] + x * x_axis[0] + y * y_axis[0],
+                    origin[1] + x * x_axis[1] + y * y_axis[1],
+                    origin[2] + x * x_axis[2] + y * y_axis[2])
+
+        left = screensize[0] // 2 - self._winsize[0] // 2 + self._position[0]
+        right = screensize[0] // 2 + int(round(self._winsize[0] / 2.0)) + \
+                self._position[0]
+        bottom = screensize[1] // 2 - int(round(self._winsize[1] / 2.0)) + \
+                 self._position[1]
+        top = screensize[1] // 2 + self._winsize[1] // 2 + self._position[1]
+        bottomleft = unproject(left, bottom)
+        bottomright = unproject(right, bottom)
+        topleft = unproject(left, top)
+        topright = unproject(right, top)
 
         self.dims = topleft, topright, bottomright, bottomleft
         width = topright[0] - topleft[0]
         height = topright[1] - bottomright[1]
         self._qdims = topleft[0], topleft[1], width, height
 
+    def reposition(self, position):
+        """Move the quad to a new position.
+
+        Only the vertex positions are updated.
+
+        Parameters
+        ----------
+        position : (int, int)
+            new position
+
+        """
+
+        self._position = position
+        self.refresh_position()
+
     def display(self):
         """Draw surface to a quad."""
 
@@ -136,13 +909,13 @@ class _LaminaPanelSurface(object):
         ogl.glTexParameterfv(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_MIN_FILTER,
                            ogl.GL_LINEAR)
         ogl.glBegin(ogl.GL_QUADS)
-        ogl.glTexCoord2f(0.0, 1.0)
+        ogl.glTexCoord2f(*self._texcoords[0])
         ogl.glVertex3f(*self.dims[0])
-        ogl.glTexCoord2f(1.0, 1.0)
+        ogl.glTexCoord2f(*self._texcoords[1])
         ogl.glVertex3f(*self.dims[1])
-        ogl.glTexCoord2f(1.0, 0.0)
+        ogl.glTexCoord2f(*self._texcoords[2])
         ogl.glVertex3f(*self.dims[2])
-        ogl.glTexCoord2f(0.0, 0.0)
+        ogl.glTexCoord2f(*self._texcoords[3])
         ogl.glVertex3f(*self.dims[3])
         ogl.glEnd()
         ogl.glDisable(ogl.GL_BLEND)
@@ -178,22 +951,106 @@ class Visual(Stimulus):
 
         """
 
-        txtr = ogl.glGenTextures(1)
+        return Visual._upload_texture(*Visual._texture_data(surf))
+
+    @staticmethod
+    def _texture_data(surf):
+        """Get the pixel data of a surface for making a texture.
+
+        For 32 bit pygame surfaces with per-pixel alpha, the pixel buffer of
+        the surface is used directly (no copy). The rows are then ordered
+        top to bottom. All other pygame surfaces are converted to RGBA.
+
+        Returns a tuple (data, internal_format, data_format, width, height,
+        row_length).
+
+        Parameters
+        ----------
+        surf : pygame.Surface or numpy.array object
+            surface to get the data from
+
+        """
+
         if isinstance(surf, pygame.Surface):
-            textureData = pygame.image.tostring(surf, "RGBA", 1)
-            colours = ogl.GL_RGBA
             width, height = surf.get_size()
+            data_format = Visual._get_buffer_format(surf)
+            if data_format is not None:
+                textureData = memoryview(surf.get_buffer())
+                row_length = surf.get_pitch() // 4
+            else:
+                textureData = pygame.image.tostring(surf, "RGBA", 0)
+                data_format = ogl.GL_RGBA
+                row_length = width
+            colours = ogl.GL_RGBA
         else:
             textureData = surf
             if textureData.shape[2] == 3:
                 colours = ogl.GL_RGB
             elif textureData.shape[2] == 4:
                 colours = ogl.GL_RGBA
+            data_format = colours
             width, height = len(surf[0]), len(surf)
+            row_length = width
+        return textureData, colours, data_format, width, height, row_length
+
+    @staticmethod
+    def _get_buffer_format(surf):
+        """Return the OpenGL format of the pixel buffer of a surface.
+
+        Returns None, if the buffer cannot be handed to OpenGL directly.
+
+        Parameters
+        ----------
+        surf : pygame.Surface
+            surface to get the format of
+
+        """
+
+        if surf.get_bytesize() != 4 or surf.get_masks()[3] == 0 or \
+                surf.get_colorkey() is not None:
+            return None
+        if sys.byteorder == "little":
+            order = [shift // 8 for shift in surf.get_shifts()]
+        else:
+            order = [3 - shift // 8 for shift in surf.get_shifts()]
+        if order == [0, 1, 2, 3]:
+            return ogl.GL_RGBA
+        elif order == [2, 1, 0, 3]:
+            return ogl.GL_BGRA
+        else:
+            return None
+
+    @staticmethod
+    def _upload_texture(textureData, colours, data_format, width, height,
+                        row_length):
+        """Upload pixel data into a new texture object.
+
+        Returns a texture object.
+
+        Parameters
+        ----------
+        textureData : buffer or numpy.array object
+            pixel data
+        colours : int
+            OpenGL internal format of the texture
+        data_format : int
+            OpenGL format of the pixel data
+        width : int
+        height : int
+        row_length : int
+            number of pixels per row in the pixel data
+
+        """
+
+        txtr = ogl.glGenTextures(1)
         ogl.glEnable(ogl.GL_TEXTURE_2D)
         ogl.glBindTexture(ogl.GL_TEXTURE_2D, txtr)
+        ogl.glPixelStorei(ogl.GL_UNPACK_ALIGNMENT, 1)
+        ogl.glPixelStorei(ogl.GL_UNPACK_ROW_LENGTH, row_length)
         ogl.glTexImage2D(ogl.GL_TEXTURE_2D, 0, colours, width, height, 0,
-          colours, ogl.GL_UNSIGNED_BYTE, textureData)
+          data_format, ogl.GL_UNSIGNED_BYTE, textureData)
+        ogl.glPixelStorei(ogl.GL_UNPACK_ROW_LENGTH, 0)
+        ogl.glPixelStorei(ogl.GL_UNPACK_ALIGNMENT, 4)
         ogl.glTexParameterf(ogl.GL_TEXTURE_2D,
                             ogl.GL_TEXTURE_MAG_FILTER,
                             ogl.GL_NEAREST)
@@ -204,6 +1061,15 @@ class Visual(Stimulus):
         return txtr
     # End of code based on Lamina module
 
+    @staticmethod
+    def _get_texture_cache():
+        """Return the shared texture cache or None, if it is switched off."""
+
+        if defaults.visual_texture_cache:
+            return _texture_cache
+        else:
+            return None
+
     def __init__(self, position=None, log_comment=None):
         """Create a visual stimulus.
 
@@ -222,11 +1088,13 @@ class Visual(Stimulus):
         else:
             self._position = list(defaults.visual_position)
         self._surface = None
+        self._surface_share = None  # copies sharing the surface: [number]
         self._is_preloaded = False
         self._parent = None
         self._ogl_screen = None
         self._is_compressed = False
         self._compression_filename = None
+        self._compression_handle = None
 
         self._was_compressed_before_preload = None
 
@@ -246,6 +1114,10 @@ class Visual(Stimulus):
                 os.remove(self._compression_filename)
             except:
                 pass
+        try:
+            self._free_compression_handle()
+        except:
+            pass
 
     @property
     def position(self):
@@ -257,7 +1129,8 @@ class Visual(Stimulus):
     def position(self, value):
         """Setter for position.
 
-        When using OpenGL, this can take longer then 1ms!
+        When using OpenGL, only the vertex positions of a preloaded stimulus
+        are updated (no texture upload).
 
         """
 
@@ -388,9 +1261,46 @@ class Visual(Stimulus):
         if self.is_compressed:
             return False
         else:
+            if surface is not self._surface:
+                self._unshare_surface(copy_surface=False)
             self._surface = surface
             return True
 
+    def _unshare_surface(self, copy_surface=True):
+        """Stop sharing the surface with copies of the stimulus.
+
+        Parameters
+        ----------
+        copy_surface : bool, optional
+            make an own copy of the surface, if it is still shared
+            (default = True)
+
+        """
+
+        if self._surface_share is not None:
+            self._surface_share[0] -= 1
+            if copy_surface and self._surface_share[0] > 0 and \
+                    self._surface is not None:
+                self._surface = self._surface.copy()
+            self._surface_share = None
+
+    def _share_surface(self, other):
+        """Share the surface of another stimulus (copy-on-write, see copy).
+
+        Parameters
+        ----------
+        other : visual expyriment stimulus
+            the stimulus with the surface
+
+        """
+
+        self._unshare_surface(copy_surface=False)
+        if other._surface_share is None:
+            other._surface_share = [1]
+        other._surface_share[0] += 1
+        self._surface_share = other._surface_share
+        self._surface = other._surface
+
     def _get_surface(self):
         """Get the surface."""
 
@@ -398,8 +1308,7 @@ class Visual(Stimulus):
             return self._surface
         else:
             if self.is_compressed:
-                tmp = pygame.image.load(
-                    self._compression_filename).convert_alpha()
+                tmp = self._load_compressed_surface()
             else:
                 tmp = self._create_surface()
             return tmp
@@ -407,38 +1316,47 @@ class Visual(Stimulus):
     def copy(self):
         """Deep copy of the visual stimulus.
 
+        The copy shares the surface (and in OpenGL mode the texture) with
+        this stimulus until one of them changes its surface (copy-on-write).
+
         Returns
         -------
         copy : deep copy of self
 
-        Notes
-        -----
-        Depending on the size of the stimulus, this method may take some time
-        to compute!
-
         """
 
-        if self.has_surface:
-            surface_backup = self._get_surface().copy()
-            surface_copy = self._get_surface().copy()
-        rtn = Stimulus.copy(self)
-        if self.has_surface:
-            self._surface = surface_backup
-            rtn._surface = surface_copy
-            rtn._is_preloaded = False
-            rtn._ogl_screen = None
+        surface = self._surface
+        ogl_screen = self._ogl_screen
+        compression_handle = self._compression_handle
+        compression_filename = self._compression_filename
+        self._surface = None
+        self._ogl_screen = None
+        self._compression_handle = None
+        self._compression_filename = None
+        try:
+            rtn = Stimulus.copy(self)
+        finally:
+            self._surface = surface
+            self._ogl_screen = ogl_screen
+            self._compression_handle = compression_handle
+            self._compression_filename = compression_filename
+
+        rtn._surface_share = None
+        if surface is not None:
+            rtn._share_surface(self)
+        if compression_handle is not None:
+            rtn._compression_handle = _compression_store.share(
+                compression_handle)
+        elif self.is_compressed:
+            # compressed to file; the copy needs its own file
             rtn._is_compressed = False
-            rtn._compression_filename = None
-        if self.is_preloaded:
-            if _internals.active_exp.screen.open_gl:
-                self._ogl_screen = _LaminaPanelSurface(
-                    self._get_surface(),
-                    position=self.position)
-            rtn.preload()
-        if self.is_compressed:
+            rtn._set_surface(self._get_surface())
             rtn.compress()
-        rtn._was_compressed_before_preload = \
-                self._was_compressed_before_preload
+        if ogl_screen is not None:
+            rtn._ogl_screen = ogl_screen.copy(rtn.position)
+            if rtn._ogl_screen is None:
+                rtn._is_preloaded = False
+                rtn.preload()
         return rtn
 
     def distance(self, other):
@@ -468,7 +1386,8 @@ class Visual(Stimulus):
     def reposition(self, new_position):
         """Move stimulus to a new position.
 
-        When using OpenGL, this can take longer then 1ms!
+        When using OpenGL, only the vertex positions of a preloaded stimulus
+        are updated (no texture upload and no new preloading).
 
         Parameters
         ----------
@@ -491,7 +1410,8 @@ class Visual(Stimulus):
     def move(self, offset):
         """Moves the stimulus in 2D space.
 
-        When using OpenGL, this can take longer then 1ms!
+        When using OpenGL, only the vertex positions of a preloaded stimulus
+        are updated (no texture upload and no new preloading).
 
         Parameters
         ----------
@@ -518,7 +1438,7 @@ class Visual(Stimulus):
             self._position[1] = self._position[1] + offset[1]
             moved = True
         if moved and self._ogl_screen is not None:
-            self._ogl_screen.refresh_position()
+            self._ogl_screen.reposition(self._position)
         return int((get_time() - start) * 1000)
 
     def inside_stimulus(self, stimulus, mode="visible"):
@@ -776,6 +1696,7 @@ class Visual(Stimulus):
         stimulus_surface_size = stimulus.surface_size
         rect.center = [self.position[0] + stimulus_surface_size[0] // 2,
                        - self.position[1] + stimulus_surface_size[1] // 2]
+        stimulus._unshare_surface()
         stimulus._get_surface().blit(self._get_surface(), rect)
         if self._logging:
             _internals.active_exp._event_file_log(
@@ -805,6 +1726,7 @@ class Visual(Stimulus):
         start = get_time()
         if self.is_preloaded:
             self.unload(keep_surface=False)
+        self._free_compression_handle()
         self._is_compressed = False
         self._set_surface(None)
         if self._logging:
@@ -815,9 +1737,12 @@ class Visual(Stimulus):
     def compress(self):
         """"Compress the stimulus.
 
-        This will create a temporary file on the disk where the surface of the
-        stimululs is written to.
-        The surface will now be read from the disk to free memory.
+        The surface of the stimulus will be stored in compressed form to free
+        memory. Depending on stimuli.defaults.visual_compression, the surface
+        is either compressed in memory ('memory'; spilled into a
+        memory-mapped temporary file, if the store exceeds
+        stimuli.defaults.visual_compression_memory_limit) or written to a
+        temporary file on the disk ('file').
         Compressed stimuli cannot do surface operations!
         Preloading comressed stimuli is possible and highly recommended.
         Depending on the size of the stimulus, this method may take some time
@@ -832,16 +1757,30 @@ class Visual(Stimulus):
 
         start = get_time()
         if self.is_compressed is False:
-            if self._compression_filename is None:
-                fid, self._compression_filename = tempfile.mkstemp(
-                    dir=defaults.tempdir, suffix=".tga")
-                os.close(fid)
-            pygame.image.save(self._get_surface(), self._compression_filename)
+            surface = self._get_surface()
+            self._free_compression_handle()
+            if defaults.visual_compression == "memory":
+                self._compression_handle = _compression_store.put(surface)
+                ratio = self._compression_handle[3] / \
+                        float(self._compression_handle[1])
+            else:
+                if self._compression_filename is None:
+                    fid, self._compression_filename = tempfile.mkstemp(
+                        dir=defaults.tempdir, suffix=".tga")
+                    os.close(fid)
+                pygame.image.save(surface, self._compression_filename)
+                ratio = None
             self._is_compressed = True
+            self._unshare_surface(copy_surface=False)
             self._surface = None
 
             if self._logging:
-                _internals.active_exp._event_file_log(
+                if ratio is not None:
+                    _internals.active_exp._event_file_log(
+                        "Stimulus,compressed,{0},ratio={1:.2f}".format(
+                            self.id, ratio), 2)
+                else:
+                    _internals.active_exp._event_file_log(
                                 "Stimulus,compressed,{0}".format(self.id), 2)
         return int((get_time() - start) * 1000)
 
@@ -862,8 +1801,9 @@ class Visual(Stimulus):
 
         start = get_time()
         if self.is_compressed:
-            self._surface = pygame.image.load(
-                self._compression_filename).convert_alpha()
+            self._unshare_surface(copy_surface=False)
+            self._surface = self._load_compressed_surface()
+            self._free_compression_handle()
             self._is_compressed = False
 
             if self._logging:
@@ -871,6 +1811,22 @@ class Visual(Stimulus):
                             "Stimulus,decompressed,{0}".format(self.id), 2)
         return int((get_time() - start) * 1000)
 
+    def _load_compressed_surface(self):
+        """Return a new surface from the compressed data."""
+
+        if self._compression_handle is not None:
+            return _compression_store.get(self._compression_handle)
+        else:
+            return pygame.image.load(
+                self._compression_filename).convert_alpha()
+
+    def _free_compression_handle(self):
+        """Remove the compressed data from the in-memory store."""
+
+        if self._compression_handle is not None:
+            _compression_store.remove(self._compression_handle)
+            self._compression_handle = None
+
     def preload(self, inhibit_ogl_compress=False):
         """Preload the stimulus to memory.
 
@@ -914,7 +1870,8 @@ class Visual(Stimulus):
             if _internals.active_exp.screen.open_gl:
                 self._ogl_screen = _LaminaPanelSurface(
                     self._get_surface(),
-                    position=self.position)
+                    position=self.position,
+                    texture_cache=Visual._get_texture_cache())
                 if not inhibit_ogl_compress:
                     self.compress()
             else:
@@ -971,7 +1928,9 @@ class Visual(Stimulus):
             _internals.active_exp._event_file_log("Stimulus,unloaded,{0}"\
                                        .format(self.id), 2)
         if not keep_surface:
+            self._free_compression_handle()
             self._is_compressed = False
+            self._unshare_surface(copy_surface=False)
             self._surface = None
             if self._logging:
                 _internals.active_exp._event_file_log("Stimulus,surface cleared,{0}"\
@@ -1036,17 +1995,62 @@ class Visual(Stimulus):
             rect.center = [self.position[0] + screen_size[0] // 2,
                            - self.position[1] + screen_size[1] // 2]
             screen.blit(self._get_surface(), rect)
+            _internals.active_exp.screen.mark_dirty(rect)
         if self._logging:
             _internals.active_exp._event_file_log("Stimulus,presented,{0}"\
                                    .format(self.id), 1,
                                  log_event_tag=log_event_tag)
         if update:
+            _internals.active_exp.screen._presented_stimulus = self.id
             _internals.active_exp.screen.update()
         if preloading_required:
             self.unload(keep_surface=keep_surface)
 
         return int((get_time() - start) * 1000)
 
+    def present_at(self, time, clear=True, log_event_tag=None):
+        """Present the stimulus on the screen at a certain time.
+
+        The stimulus is drawn into the back buffer immediately and the screen
+        is updated at the target time (see `io.Screen.update_at`). For
+        precise onsets, the stimulus should be preloaded and the refresh
+        interval of the screen should be known (see
+        `io.Screen.measure_refresh_interval`).
+
+        Parameters
+        ----------
+        time : float
+            target time (in ms with respect to the experiment clock)
+        clear : bool, optional
+            if True the screen will be cleared automatically
+            (default = True)
+        log_event_tag : numeral or string, optional
+            if log_event_tag is defined and if logging is switched on for this
+            stimulus (default), a summary of the inter-event-intervalls are
+            appended at the end of the event file
+
+        Returns
+        -------
+        onset : float
+            measured onset (in ms with respect to the experiment clock)
+
+        """
+
+        logging = self._logging
+        self._logging = False
+        try:
+            self.present(clear=clear, update=False)
+        finally:
+            self._logging = logging
+        screen = _internals.active_exp.screen
+        screen._presented_stimulus = self.id
+        onset = screen.update_at(time)
+        if self._logging:
+            _internals.active_exp._event_file_log("Stimulus,presented,{0}"\
+                                   .format(self.id), 1,
+                                 log_event_tag=log_event_tag)
+        return onset
+
     def save(self, filename):
         """Save the stimulus as image.
 
@@ -1259,16 +2263,19 @@ class Visual(Stimulus):
             "Stimulus,flipped,{0}, booleans={1}".format(self.id, booleans), 2)
         return int((get_time() - start) * 1000)
 
-    def blur(self, level):
+    def blur(self, level, mode="scale"):
         """Blur the stimulus.
 
-        This blurs the stimulus, by scaling it down and up by the factor of
-        'level'.
-
         Parameters
         ----------
-        level : int
-            level of bluring
+        level : int or float
+            level of bluring (mode 'scale': scaling factor, mode 'gaussian':
+            standard deviation in pixels, mode 'box': radius in pixels)
+        mode : str, optional
+            'scale': scale the stimulus down and up by the factor of 'level'
+            (default)
+            'gaussian': Gaussian blur (requires NumPy)
+            'box': box blur (requires NumPy)
 
         Returns
         -------
@@ -1277,20 +2284,41 @@ class Visual(Stimulus):
 
         Notes
         -----
+        The modes 'gaussian' and 'box' are separable filters that treat the
+        alpha channel correctly (premultiplied alpha). Box filters are
+        computed from window sums, and Gaussian filters (with standard
+        deviations of at least 2 pixels) are approximated by three box
+        filters, so that their time hardly depends on the level. They are of
+        higher quality than 'scale', but slower.
         Depending on the size of the stimulus, this method may take some time
         to compute!
 
         """
 
         start = get_time()
-        self.scale((1.0 / level, 1.0 / level))
-        self.scale((level, level))
+        if mode == "scale":
+            self.scale((1.0 / level, 1.0 / level))
+            self.scale((level, level))
+        elif mode in ("gaussian", "box"):
+            if np is None:
+                raise ImportError("Blur mode '{0}' needs the Python package "
+                                  "'Numpy'.".format(mode))
+            if level <= 0:
+                raise ValueError("Blur level has to be larger than 0!")
+            if not self._set_surface(self._get_surface()):
+                raise RuntimeError(
+                    Visual._compression_exception_message.format("blur()"))
+            self.unload(keep_surface=True)
+            self._unshare_surface()
+            _blur_surface(self._get_surface(), mode, level)
+        else:
+            raise ValueError("Unknown blur mode '{0}'!".format(mode))
         if self._logging:
             _internals.active_exp._event_file_log(
                 "Stimulus,blured,{0}, level={1}".format(self.id, level), 2)
         return int((get_time() - start) * 1000)
 
-    def scramble(self, grain_size):
+    def scramble(self, grain_size, random_seed=None):
         """Scramble the stimulus.
 
         Attention: If the surface size is not a multiple of the grain size,
@@ -1300,6 +2328,9 @@ class Visual(Stimulus):
         ----------
         grain_size : int or (int, int)
             size of a grain (use tuple of integers for different width & height)
+        random_seed : int, optional
+            seed for the random order of the grains; the global random number
+            generator is not affected (default = None, i.e. random)
 
         Returns
         -------
@@ -1308,32 +2339,60 @@ class Visual(Stimulus):
 
         Notes
         -----
-        Depending on the size of the stimulus, this method may take some time
-        to compute!
+        If NumPy is installed, the grains are shuffled as array blocks.
+        Otherwise, depending on the size of the stimulus, this method may take
+        some time to compute!
 
         """
 
         start = get_time()
         if isinstance(grain_size, int):
             grain_size = [grain_size, grain_size]
-        # Make Rect list
+        grain_size = [int(grain_size[0]), int(grain_size[1])]
         if not self._set_surface(self._get_surface()):
             raise RuntimeError(Visual._compression_exception_message.format(
                 "scramble()"))
         s = self.surface_size
-        source = []
-        for r in range(s[1] // int(grain_size[1])):
-            for c in range(s[0] // int(grain_size[0])):
-                xy = (c * int(grain_size[0]), r * int(grain_size[1]))
-                source.append(pygame.Rect(xy, grain_size))
-        # Make copy and shuffle
-        dest = copy.deepcopy(source)
-        random.shuffle(dest)
-        # Create a new surface
+        n_x = s[0] // grain_size[0]
+        n_y = s[1] // grain_size[1]
         tmp_surface = pygame.surface.Surface(
             s, pygame.SRCALPHA).convert_alpha()
-        for n, s in enumerate(source):
-            tmp_surface.blit(self._get_surface(), dest[n], s)
+        if np is not None and self._get_surface().get_bytesize() in (3, 4):
+            order = np.random.RandomState(random_seed).permutation(n_x * n_y)
+            width = n_x * grain_size[0]
+            height = n_y * grain_size[1]
+
+            def shuffle_blocks(array):
+                # (x, y, ...) -> (grain, grain x, grain y, ...) and back
+                shape = array.shape[2:]
+                blocks = array[:width, :height].reshape(
+                    (n_x, grain_size[0], n_y, grain_size[1]) + shape)
+                blocks = blocks.swapaxes(1, 2).reshape(
+                    (n_x * n_y, grain_size[0], grain_size[1]) + shape)
+                blocks = blocks[order].reshape(
+                    (n_x, n_y, grain_size[0], grain_size[1]) + shape)
+                return blocks.swapaxes(1, 2).reshape((width, height) + shape)
+
+            rgb = pygame.surfarray.pixels3d(tmp_surface)
+            rgb[:width, :height] = shuffle_blocks(
+                pygame.surfarray.array3d(self._get_surface()))
+            del rgb
+            alpha = pygame.surfarray.pixels_alpha(tmp_surface)
+            alpha[:width, :height] = shuffle_blocks(
+                pygame.surfarray.array_alpha(self._get_surface()))
+            del alpha
+        else:
+            # Make Rect list
+            source = []
+            for r in range(n_y):
+                for c in range(n_x):
+                    xy = (c * grain_size[0], r * grain_size[1])
+                    source.append(pygame.Rect(xy, grain_size))
+            # Make copy and shuffle
+            dest = copy.deepcopy(source)
+            random.Random(random_seed).shuffle(dest)
+            for n, rect in enumerate(source):
+                tmp_surface.blit(self._get_surface(), dest[n], rect)
         self._set_surface(tmp_surface)
 
         if self._logging:
@@ -1342,11 +2401,9 @@ class Visual(Stimulus):
                                      self.id, grain_size), 2)
         return int((get_time() - start) * 1000)
 
-    def add_noise(self, grain_size, percentage, colour):
+    def add_noise(self, grain_size, percentage, colour, random_seed=None):
         """Add visual noise on top of the stimulus.
 
-        This function might take very long for large stimuli.
-
         Parameters
         ----------
         grain_size : int
@@ -1355,6 +2412,9 @@ class Visual(Stimulus):
             percentage of covered area
         colour : (int, int, int)
             colour (RGB) of the noise
+        random_seed : int, optional
+            seed for the random positions of the grains; the global random
+            number generator is not affected (default = None, i.e. random)
 
         Returns
         -------
@@ -1363,30 +2423,57 @@ class Visual(Stimulus):
 
         Notes
         -----
-        Depending on the size of the stimulus, this method may take some time
-        to compute!
+        If NumPy is installed, the grains are drawn at once on an array view
+        of the surface. Otherwise, this function might take very long for
+        large stimuli!
 
         """
+
         from . import _rectangle
         start = get_time()
         if not self._set_surface(self._get_surface()):
             raise RuntimeError(Visual._compression_exception_message.format(
                 "add_noise()"))
         self.unload(keep_surface=True)
-        number_of_pixel_x = int(self.surface_size[0] // grain_size) + 1
-        number_of_pixel_y = int(self.surface_size[1] // grain_size) + 1
-        seq = list(range(number_of_pixel_x * number_of_pixel_y))
-        random.seed()
-        random.shuffle(seq)
-
-        for idx in seq[:int(len(seq) * (percentage) / 100.0)]:
-            x = (idx % number_of_pixel_x) * grain_size
-            x = int(self.surface_size[0] // 2 - grain_size // 2 - x)
-            y = (idx // number_of_pixel_x) * grain_size
-            y = int(self.surface_size[1] // 2 - grain_size // 2 - y)
-            dot = _rectangle.Rectangle(size=(grain_size, grain_size),
-                            position=(x, y), colour=colour)
-            dot.plot(self)
+        self._unshare_surface()
+        surface_size = self.surface_size
+        number_of_pixel_x = int(surface_size[0] // grain_size) + 1
+        number_of_pixel_y = int(surface_size[1] // grain_size) + 1
+        n_grains = int(number_of_pixel_x * number_of_pixel_y *
+                       percentage / 100.0)
+        if np is not None and self._get_surface().get_bytesize() in (3, 4):
+            idx = np.random.RandomState(random_seed).permutation(
+                number_of_pixel_x * number_of_pixel_y)[:n_grains]
+            grains = np.zeros((number_of_pixel_x, number_of_pixel_y),
+                              dtype=bool)
+            grains[idx % number_of_pixel_x, idx // number_of_pixel_x] = True
+            # same grid as the loop below: columns are counted from the right
+            # edge, rows from the top edge
+            offset = (number_of_pixel_x - 1) * grain_size - \
+                     2 * (surface_size[0] // 2) + 2 * (grain_size // 2)
+            column = (np.arange(surface_size[0]) + offset) // grain_size
+            row = np.arange(surface_size[1]) // grain_size
+            inside = column < number_of_pixel_x
+            mask = np.zeros(surface_size, dtype=bool)
+            mask[inside] = grains[::-1][column[inside]][:, row]
+            rgb = pygame.surfarray.pixels3d(self._get_surface())
+            rgb[mask] = colour[:3]
+            del rgb
+            if self._get_surface().get_masks()[3] != 0:
+                alpha = pygame.surfarray.pixels_alpha(self._get_surface())
+                alpha[mask] = 255
+                del alpha
+        else:
+            seq = list(range(number_of_pixel_x * number_of_pixel_y))
+            random.Random(random_seed).shuffle(seq)
+            for idx in seq[:n_grains]:
+                x = (idx % number_of_pixel_x) * grain_size
+                x = int(surface_size[0] // 2 - grain_size // 2 - x)
+                y = (idx // number_of_pixel_x) * grain_size
+                y = int(surface_size[1] // 2 - grain_size // 2 - y)
+                dot = _rectangle.Rectangle(size=(grain_size, grain_size),
+                                position=(x, y), colour=colour)
+                dot.plot(self)
         if self._logging:
             _internals.active_exp._event_file_log(
                     "Stimulus,noise added,{0}, grain_size={1}, percentage={2}"\
@@ -21,6 +21,23 @@ import atexit as _atexit
 
 # Visual
 visual_position = (0, 0)
+visual_texture_cache = True  # share OpenGL textures of identical surfaces
+visual_texture_cache_size = 256  # in MB; 'None' is unlimited
+visual_texture_atlas = True  # pack small textures into shared textures
+visual_texture_atlas_size = 1024  # width and height of atlas textures
+visual_texture_atlas_pages = 4  # maximal number of atlas textures
+visual_texture_atlas_max_stimulus_size = 64  # larger ones get own textures
+visual_compression = "memory"  # 'memory' (zlib) or 'file' (TGA in tempdir)
+visual_compression_level = 1  # zlib level (1 = fastest, 9 = smallest)
+visual_compression_memory_limit = 512  # in MB, then spill into a
+                                       # memory-mapped file; 'None' is
+                                       # unlimited
+render_cache = False  # cache generated stimuli on disk (see RenderCache)
+render_cache_directory = None  # 'None' is expyriment_render_cache in the
+                               # system's temporary directory
+render_cache_size = 512  # in MB; 'None' is unlimited
+font_cache_size = 64  # maximal number of cached fonts (see FontCache);
+                      # 'None' is unlimited
 
 # Canvas
 canvas_colour = None  # 'None' is transparent
@@ -114,6 +131,8 @@ tone_frequency = 440
 tone_samplerate = 44100
 tone_bitdepth = 16
 tone_amplitude = 0.5
+tone_ramp = 0  # in ms
+tone_channels = 1
 
 # Create tmp for compressed stimuli folder
 try:
@@ -17,12 +17,15 @@ __revision__ = ''
 __date__ = ''
 
 
+import math
 import random
 import pygame
 
 from ... import _internals, stimuli
+from ...misc import geometry
 from ...stimuli._visual import Visual
 from ...stimuli._circle import Circle
+from ...stimuli._render_cache import get_render_cache
 from . import  defaults
 
 
@@ -160,30 +163,8 @@ class DotCloud(Visual):
             pygame.draw.circle(self._area._get_surface(), self._background_colour,
                                (self._radius, self._radius), self._radius)
 
-    def _is_overlapping_with_point(self, dot, gap):
-        """Return True if a dot in the cloud is overlapping with another dot.
-
-        Parameters
-        ----------
-        dot : stimuli.dot
-            the other dot
-        gap : int
-            constant added to the distance
-
-        Returns
-        -------
-        out : bool
-            True if a dot in the cloud is overlapping with another dot
-
-        """
-
-        for elem in self._cloud:
-            d = elem.distance(dot)
-            if d <= (elem.radius + dot.radius + gap):
-                return True
-        return False
-
-    def make(self, n_dots, dot_radius, gap=0, multi_colour=None):
+    def make(self, n_dots, dot_radius, gap=0, multi_colour=None,
+             random_seed=None, placement=None, max_attempts=None):
         """Make the cloud by randomly putting dots on it.
 
         Parameters
@@ -200,9 +181,55 @@ class DotCloud(Visual):
             If the multi_colour list is defined, n_dots has to be a list of
             integers of the same length. The cloud comprises then dots
             in different colours according the specified distribution
+        random_seed : int, optional
+            seed for the random positions; clouds with a random seed can be
+            stored in the render cache (see stimuli.defaults.render_cache)
+        placement : str, optional
+            'random' (dots are put at random positions one after the
+            other) or 'poisson' (dots are chosen from a Poisson-disc sampling
+            of the cloud, which is fast also for dense clouds)
+        max_attempts : int, optional
+            maximal number of random positions to try ('random' placement)
+
+        Returns
+        -------
+        success : bool
+            False if no solution could be found
 
         """
 
+        if placement is None:
+            placement = defaults.dotcloud_placement
+        if max_attempts is None:
+            max_attempts = defaults.dotcloud_max_attempts
+
+        cache = get_render_cache()
+        if cache is not None and random_seed is not None:
+            key = cache.make_key(
+                "DotCloud",
+                {"radius": self._radius,
+                 "background_colour": self._background_colour,
+                 "dot_colour": self._dot_colour, "n_dots": n_dots,
+                 "dot_radius": dot_radius, "gap": gap,
+                 "multi_colour": multi_colour, "placement": placement,
+                 "max_attempts": max_attempts}, random_seed)
+            entry = cache.get(key)
+            if entry is not None:
+                self._cloud = []
+                for x, y, colour in entry[1]:
+                    dot = Circle(radius=dot_radius, colour=colour)
+                    stimuli._stimulus.Stimulus._id_counter -= 1
+                    dot.position = (x, y)
+                    self._cloud.append(dot)
+                self.clear_surface()
+                return True
+        else:
+            cache = None
+        if random_seed is None:
+            rnd = random
+        else:
+            rnd = random.Random(random_seed)
+
         if multi_colour is not None:
             dot_distribution = list(n_dots)
             if len(multi_colour) != len(n_dots):
@@ -210,47 +237,94 @@ class DotCloud(Visual):
                         "have to have the same length,")
             n_dots = sum(dot_distribution)
 
-        top_left = dot_radius - self._radius
-        bottom_right = self._radius - dot_radius
-        remix = 0
-        while True: #remix-loop
-            self._cloud = []
-            remix = remix + 1
-            reps = 0
-            while True: #find a solution
-                if multi_colour is None:
-                    dot = Circle(radius=dot_radius, colour = self._dot_colour)
+        if multi_colour is None:
+            colours = [self._dot_colour] * n_dots
+        else:
+            colours = []
+            for colour, n in zip(multi_colour, dot_distribution):
+                colours.extend([colour] * n)
+
+        if placement == "random":
+            positions = self._place_random(n_dots, dot_radius, gap, rnd,
+                                           max_attempts)
+        elif placement == "poisson":
+            positions = self._place_poisson(n_dots, dot_radius, gap, rnd)
+        else:
+            raise ValueError("Unknown placement: {0}".format(placement))
+        if positions is None:
+            message = "Dotcloud make: Cannot find a solution."
+            print(("Warning: ", message))
+            if self._logging:
+                _internals.active_exp._event_file_log(message)
+            return False
+
+        self._cloud = []
+        for position, colour in zip(positions, colours):
+            dot = Circle(radius=dot_radius, colour=colour)
+            stimuli._stimulus.Stimulus._id_counter -= 1
+            dot.position = position
+            self._cloud.append(dot)
+        self.clear_surface()
+        if cache is not None:
+            cache.put(key, metadata=[
+                [d.position[0], d.position[1], list(d.colour)]
+                for d in self._cloud])
+        return True
+
+    def _place_random(self, n_dots, dot_radius, gap, rnd, max_attempts):
+        """Return random non-overlapping dot positions (or None).
+
+        Candidates are checked only against the dots in neighbouring cells of
+        a spatial grid. After 10000 consecutive failures, the placement
+        starts anew.
+
+        """
+
+        limit = self._radius - dot_radius
+        min_distance = 2 * dot_radius + gap
+        grid = geometry.SpatialGrid(min_distance)
+        positions = []
+        reps = 0
+        for _attempt in range(max_attempts):
+            x = rnd.randint(-limit, limit)
+            y = rnd.randint(-limit, limit)
+            reps = reps + 1
+            if math.hypot(x, y) <= limit:
+                for px, py in grid.query((x - min_distance, y - min_distance,
+                                          x + min_distance, y + min_distance)):
+                    if math.hypot(px - x, py - y) <= min_distance:
+                        break
                 else:
-                    # find colour counter
-                    s = 0
-                    for colour_cnt, d in enumerate(dot_distribution):
-                        s += d
-                        if len(self._cloud) < s:
-                            break
-                    dot = Circle(radius=dot_radius,
-                                colour=multi_colour[colour_cnt])
-
-                stimuli._stimulus.Stimulus._id_counter -= 1
-                dot.position = (random.randint(top_left, bottom_right),
-                                random.randint(top_left, bottom_right))
-                reps = reps + 1
-
-                if dot.inside_circle(self.area):
-                    if not self._is_overlapping_with_point(dot, gap):
-                        self._cloud.append(dot)
-                        reps = 0
-                if reps > 10000:
-                    break
-                if len(self._cloud) >= n_dots:
-                    self.clear_surface()
-                    return True
-
-            if remix > 10:
-                message = "Dotcloud make: Cannot find a solution."
-                print(("Warning: ", message))
-                if self._logging:
-                    _internals.active_exp._event_file_log(message)
-                return False
+                    positions.append((x, y))
+                    grid.add((x, y), (x, y, x, y))
+                    reps = 0
+                    if len(positions) >= n_dots:
+                        return positions
+            if reps > 10000:  # remix
+                positions = []
+                grid.clear()
+                reps = 0
+        return None
+
+    def _place_poisson(self, n_dots, dot_radius, gap, rnd):
+        """Return dot positions from a Poisson-disc sampling (or None)."""
+
+        limit = self._radius - dot_radius
+        # strictly larger distance, robust against rounding to integers
+        min_distance = 2 * dot_radius + gap + 2
+        for _remix in range(10):
+            points = geometry.poisson_disc_sampling(
+                (2 * limit + 1, 2 * limit + 1), min_distance,
+                random_seed=rnd.randrange(2 ** 31))
+            positions = []
+            for x, y in points:
+                x, y = int(round(x)), int(round(y))
+                if math.hypot(x, y) <= limit:
+                    positions.append((x, y))
+            if len(positions) >= n_dots:
+                rnd.shuffle(positions)
+                return positions[:n_dots]
+        return None
 
     def shuffel_dot_sequence(self, from_idx=0, to_idx= -1):
         """Shuffle the dots sequence.
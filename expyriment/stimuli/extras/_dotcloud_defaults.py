@@ -5,4 +5,6 @@ dotcloud_background_colour = None # 'None' is transparent
 dotcloud_position = (0, 0)
 dotcloud_rotation = None
 dotcloud_scaling = None
-dotcloud_flipping = None
\ No newline at end of file
+dotcloud_flipping = None
+dotcloud_placement = "random" # 'random' or 'poisson'
+dotcloud_max_attempts = 100000
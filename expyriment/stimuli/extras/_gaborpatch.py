@@ -15,25 +15,21 @@ __version__ = ''
 __revision__ = ''
 __date__ = ''
 
-import os
-import tempfile
 from types import ModuleType
 
-from ...stimuli._picture import Picture
-from ... import stimuli
+import pygame
+
+from ...stimuli._visual import Visual
+from ...stimuli._render_cache import get_render_cache
 from . import defaults
 
 try:
     import numpy as np
 except:
     np = None
-try:
-    from matplotlib import pyplot
-except:
-    pyplot = None
 
 
-class GaborPatch(Picture):
+class GaborPatch(Visual):
     """A class implementing a Gabor Patch."""
 
     def __init__(self, size=None, position=None, lambda_=None, theta=None,
@@ -54,6 +50,8 @@ class GaborPatch(Picture):
             gaussian standard deviation (in pixels)
         phase : float
             0 to 1 inclusive
+        trim : float, optional
+            values of the gaussian envelope below trim are set to 0
 
         Notes
         -----
@@ -61,6 +59,9 @@ class GaborPatch(Picture):
         the Gabor patch and can be determined (e.g. for plotting) with the
         property `GaborPatch.background_colour`.
 
+        To create many Gabor patches that differ only in orientation and
+        phase, use `GaborPatch.create_batch`.
+
         """
 
         # Parts of the code has be ported from http://www.icn.ucl.ac.uk/courses/MATLAB-Tutorials/Elliot_Freeman/html/gabor_tutorial.html
@@ -70,11 +71,6 @@ class GaborPatch(Picture):
 The Python package 'Numpy' is not installed."""
             raise ImportError(message)
 
-        if not isinstance(pyplot, ModuleType):
-            message = """GaborPatch can not be initialized.
-The Python package 'Matplotlib' is not installed."""
-            raise ImportError(message)
-
         if size is None:
             size = defaults.gaborpatch_size
         if position is None:
@@ -87,59 +83,185 @@ The Python package 'Matplotlib' is not installed."""
             sigma = defaults.gaborpatch_sigma
         if phase is None:
             phase = defaults.gaborpatch_phase
+        if trim is None:
+            trim = defaults.gaborpatch_trim
+
+        Visual.__init__(self, position)
+        self._size = size
+        self._lambda = lambda_
+        self._theta = theta
+        self._sigma = sigma
+        self._phase = phase
+        self._trim = trim
+        self._pixel_array = None
+        self._background_colour = None
+
+    @classmethod
+    def create_batch(cls, thetas=None, phases=None, size=None, position=None,
+                     lambda_=None, sigma=None, trim=None):
+        """Create many Gabor patches in one vectorised pass.
 
-        fid, filename = tempfile.mkstemp(
-                    dir=stimuli.defaults.tempdir,
-                    suffix=".png")
-        os.close(fid)
-        Picture.__init__(self, filename, position)
+        Parameters
+        ----------
+        thetas : list of int or float, optional
+            grating orientations in degrees
+        phases : list of float, optional
+            phases (0 to 1 inclusive)
+        size : int, optional
+            size of the patches
+        position : (int, int), optional
+            position of the patches
+        lambda_ : int, optional
+            Spatial frequency (pixel per cycle)
+        sigma : int or float, optional
+            gaussian standard deviation (in pixels)
+        trim : float, optional
+            values of the gaussian envelope below trim are set to 0
+
+        Returns
+        -------
+        patches : list of GaborPatch
+            one patch for each pair of theta and phase (a single theta or
+            phase is used for all patches)
+
+        """
+
+        if thetas is None:
+            thetas = [defaults.gaborpatch_theta]
+        if phases is None:
+            phases = [defaults.gaborpatch_phase]
+        # plain floats, so that the render cache keys are the same as for
+        # single patches
+        thetas = [float(x) for x in np.atleast_1d(thetas)]
+        phases = [float(x) for x in np.atleast_1d(phases)]
+        if len(thetas) == 1:
+            thetas = thetas * len(phases)
+        elif len(phases) == 1:
+            phases = phases * len(thetas)
+        if len(thetas) != len(phases):
+            raise ValueError("thetas and phases must have the same length!")
+
+        patches = [cls(size=size, position=position, lambda_=lambda_,
+                       theta=theta, sigma=sigma, phase=phase, trim=trim)
+                   for theta, phase in zip(thetas, phases)]
+        if len(patches) > 0:
+            first = patches[0]
+            pixel_arrays = GaborPatch._make_pixel_arrays(
+                first._size, first._lambda, np.array(thetas, dtype=float),
+                first._sigma, np.array(phases, dtype=float), first._trim)
+            for patch, pixel_array in zip(patches, pixel_arrays):
+                patch._pixel_array = pixel_array
+        return patches
+
+    @staticmethod
+    def _make_pixel_arrays(size, lambda_, thetas, sigma, phases, trim):
+        """Return the pixel arrays of Gabor patches.
+
+        Parameters
+        ----------
+        size : int
+        lambda_ : int or float
+        thetas : numpy.ndarray
+            orientations in degrees (n)
+        sigma : int or float
+        phases : numpy.ndarray
+            phases (n)
+        trim : float
+
+        Returns
+        -------
+        pixel_arrays : numpy.ndarray
+            array (n, size, size) of values between -1 and 1
+
+        """
 
         # make linear ramp
-        X0 = (np.linspace(1, size, size) // size) - .5
+        X0 = (np.linspace(1, size, size) / size) - .5
         # Set wavelength and phase
         freq = size / float(lambda_)
-        phaseRad = phase * 2 * np.pi
+        phaseRad = (phases * 2 * np.pi)[:, None, None]
         # Make 2D grating
         Xm, Ym = np.meshgrid(X0, X0)
         # Change orientation by adding Xm and Ym together in different proportions
-        thetaRad = (theta / 360.) * 2 * np.pi
-        Xt = Xm * np.cos(thetaRad)
-        Yt = Ym * np.sin(thetaRad)
+        thetaRad = (thetas / 360.) * 2 * np.pi
+        Xt = Xm[None, :, :] * np.cos(thetaRad)[:, None, None]
+        Yt = Ym[None, :, :] * np.sin(thetaRad)[:, None, None]
         grating = np.sin(((Xt + Yt) * freq * 2 * np.pi) + phaseRad)
         # 2D Gaussian distribution
         gauss = np.exp(-((Xm ** 2) + (Ym ** 2)) / (2 * (sigma / float(size)) ** 2))
         # Trim
         gauss[gauss < trim] = 0
 
-        self._pixel_array = grating * gauss
+        return grating * gauss[None, :, :]
 
-        #save stimulus
-        color_map = pyplot.get_cmap('gray')
-        color_map.set_over(color="y")
+    def _get_cache_key(self, cache):
+        return cache.make_key("GaborPatch",
+                              {"size": self._size, "lambda_": self._lambda,
+                               "theta": float(self._theta),
+                               "sigma": self._sigma,
+                               "phase": float(self._phase),
+                               "trim": self._trim})
 
-        pyplot.imsave(fname = filename,
-                    arr  = self._pixel_array,
-                    cmap = color_map, format="png")
+    def _get_grey_values(self):
+        """Return the grey values (uint8) of the patch and the background.
 
-        # determine background color
-        norm = pyplot.normalize(vmin = np.min(self._pixel_array),
-                                vmax = np.max(self._pixel_array))
-        bgc = color_map(norm(0))
-        self._background_colour = [int(x*255) for x in bgc[:3]]
+        The pixel values are mapped linearly from their range onto 0 to 255.
+
+        """
+
+        pixel_array = self.pixel_array
+        minimum = pixel_array.min()
+        value_range = pixel_array.max() - minimum
+        if value_range == 0:
+            value_range = 1
+        grey = np.clip((pixel_array - minimum) * (256.0 / value_range),
+                       0, 255).astype(np.uint8)
+        background = int(min(max((0 - minimum) * (256.0 / value_range), 0),
+                             255))
+        return grey, background
 
     @property
     def background_colour(self):
         """Getter for background_colour"""
 
+        if self._background_colour is None:
+            _grey, background = self._get_grey_values()
+            self._background_colour = [background] * 3
         return self._background_colour
 
-
     @property
     def pixel_array(self):
         """Getter for pixel_array"""
 
+        if self._pixel_array is None:
+            self._pixel_array = GaborPatch._make_pixel_arrays(
+                self._size, self._lambda, np.array([self._theta], dtype=float),
+                self._sigma, np.array([self._phase], dtype=float),
+                self._trim)[0]
         return self._pixel_array
 
+    def _create_surface(self):
+        """Create the surface of the stimulus."""
+
+        cache = get_render_cache()
+        if cache is not None:
+            key = self._get_cache_key(cache)
+            entry = cache.get(key)
+            if entry is not None:
+                self._background_colour = entry[1]["background_colour"]
+                return entry[0]
+
+        grey, background = self._get_grey_values()
+        self._background_colour = [background] * 3
+        # surfarray indexes (x, y)
+        rgb = np.repeat(grey.T[:, :, None], 3, axis=2)
+        surface = pygame.surfarray.make_surface(rgb).convert_alpha()
+        if cache is not None:
+            cache.put(key, surface,
+                      {"background_colour": self._background_colour})
+        return surface
+
+
 if __name__ == "__main__":
     from .. import control, design, misc
     control.set_develop_mode(True)
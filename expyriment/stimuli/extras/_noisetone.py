@@ -18,23 +18,26 @@ __date__ = ''
 
 
 import os
-import wave
-import struct
-import itertools
 import tempfile
 import shutil
 import random
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from . import defaults
 from ...stimuli import defaults as stim_defaults
 from ...stimuli._audio import Audio
+from ...stimuli._tone import _apply_ramp, _write_wave
 
 
 class NoiseTone(Audio):
     """A class implementing a noise tone stimulus."""
 
     def __init__(self, duration, samplerate=None, bitdepth=None,
-                 amplitude=None):
+                 amplitude=None, ramp=None, channels=None):
         """Create a noise tone.
 
         Parameters
@@ -49,6 +52,10 @@ class NoiseTone(Audio):
             bitdeth of the noise tone
         amplitude : int, optional
             amplitude of the noise tone
+        ramp : int, optional
+            duration of the linear fade-in and fade-out in ms
+        channels : int, optional
+            number of channels (all with the same noise)
 
         """
 
@@ -62,6 +69,12 @@ class NoiseTone(Audio):
         if amplitude is None:
             amplitude = defaults.noisetone_amplitude
         self._amplitude = amplitude
+        if ramp is None:
+            ramp = defaults.noisetone_ramp
+        self._ramp = ramp
+        if channels is None:
+            channels = defaults.noisetone_channels
+        self._channels = channels
         filename = self._create_noise_wave()
         Audio.__init__(self, filename)
 
@@ -81,7 +94,7 @@ class NoiseTone(Audio):
                 "duration"))
         else:
             self._duration = value / 1000.0
-            self._filename = self._create_sine_wave()
+            self._filename = self._create_noise_wave()
 
 
     @property
@@ -99,7 +112,7 @@ class NoiseTone(Audio):
                 "samplerate"))
         else:
             self._samplerate = value
-            self._filename = self._create_sine_wave()
+            self._filename = self._create_noise_wave()
 
     @property
     def bitdepth(self):
@@ -116,7 +129,7 @@ class NoiseTone(Audio):
                 "bitdepth"))
         else:
             self._bitdepth = value
-            self._filename = self._create_sine_wave()
+            self._filename = self._create_noise_wave()
 
     @property
     def amplitude(self):
@@ -133,37 +146,59 @@ class NoiseTone(Audio):
                 "amplitude"))
         else:
             self._amplitude = value
-            self._filename = self._create_sine_wave()
+            self._filename = self._create_noise_wave()
+
+    @property
+    def ramp(self):
+        """Getter for ramp."""
 
-    def _grouper(self, n, iterable, fillvalue=None):
-        """Write in chunks."""
+        return self._ramp
 
-        args = [iter(iterable)] * n
-        return itertools.zip_longest(fillvalue=fillvalue, *args)
+    @ramp.setter
+    def ramp(self, value):
+        """Setter for ramp."""
+
+        if self.is_preloaded:
+            raise AttributeError(Audio._getter_exception_message.format(
+                "ramp"))
+        else:
+            self._ramp = value
+            self._filename = self._create_noise_wave()
+
+    @property
+    def channels(self):
+        """Getter for channels."""
+
+        return self._channels
+
+    @channels.setter
+    def channels(self, value):
+        """Setter for channels."""
+
+        if self.is_preloaded:
+            raise AttributeError(Audio._getter_exception_message.format(
+                "channels"))
+        else:
+            self._channels = value
+            self._filename = self._create_noise_wave()
 
     def _create_noise_wave(self):
-        """Create the sine wave."""
-
-        random.seed()
-        noise = (float(self._amplitude) * random.uniform(-1, 1) for _ in \
-                 itertools.count(0))
-        channels = ((noise,),)
-        n_samples = self._duration * self._samplerate
-        samples = itertools.islice(zip(
-            *(map(sum, zip(*channel)) \
-              for channel in channels)), n_samples)
+        """Create the noise wave."""
+
+        n_samples = int(self._duration * self._samplerate)
+        if np is not None:
+            samples = float(self._amplitude) * \
+                      np.random.RandomState().uniform(-1, 1, n_samples)
+        else:
+            rnd = random.Random()
+            samples = [float(self._amplitude) * rnd.uniform(-1, 1)
+                       for _ in range(n_samples)]
+        samples = _apply_ramp(samples,
+                              self._ramp / 1000.0 * self._samplerate)
         fid, filename = tempfile.mkstemp(dir=stim_defaults.tempdir, suffix=".wav")
         os.close(fid)
-        w = wave.open(filename, 'w')
-        w.setparams((1, self._bitdepth // 8, self._samplerate, n_samples, 'NONE',
-                     'not compressed'))
-        max_amplitude = float(int((2 ** (self._bitdepth)) / 2) - 1)
-        for chunk in self._grouper(2048, samples):
-            frames = ''.join(''.join(struct.pack(
-                'h', int(max_amplitude * sample)) for sample in channels) \
-                for channels in chunk if channels is not None)
-            w.writeframesraw(frames)
-        w.close()
+        _write_wave(filename, samples, self._samplerate, self._bitdepth,
+                    self._channels)
         return filename
 
     def save(self, filename):
@@ -2,3 +2,5 @@
 noisetone_samplerate = 44100
 noisetone_bitdepth = 16
 noisetone_amplitude = 0.5
+noisetone_ramp = 0  # in ms
+noisetone_channels = 1
@@ -19,6 +19,12 @@ __date__ = ''
 
 import math
 import random
+from types import ModuleType
+
+try:
+    import numpy as np
+except:
+    np = None
 
 from . import defaults
 
@@ -26,11 +32,18 @@ from ...io import Keyboard
 from ...stimuli import Canvas, Circle
 from ...stimuli._stimulus import Stimulus
 from ...misc import Clock
+from ...misc._timer import get_time
 
 
 
 class RandomDotKinematogram(Stimulus):
-    """Random Dot Kinematogram"""
+    """Random Dot Kinematogram
+
+    The dots are stored in NumPy arrays (start positions, movement vectors,
+    birth times and extra ages) and are updated with vectorised operations.
+    Each frame is drawn by blitting one pre-rendered dot sprite for all dots.
+
+    """
 
     def __init__(self, area_radius, n_dots, target_direction, target_dot_ratio,
                 position = None, dot_speed = None, dot_lifetime = None,
@@ -73,6 +86,12 @@ class RandomDotKinematogram(Stimulus):
         Logging is switch off per default
 
         """
+
+        if not isinstance(np, ModuleType):
+            message = """RandomDotKinematogram can not be initialized.
+The Python package 'Numpy' is not installed."""
+            raise ImportError(message)
+
         if dot_speed is None:
             dot_speed = defaults.randomdotkinematogram_dot_speed
         if dot_lifetime is None:
@@ -97,10 +116,17 @@ class RandomDotKinematogram(Stimulus):
         self._canvas = Canvas(size=(2*(self.area_radius + self.dot_radius),
                                     2*(self.area_radius + self.dot_radius)),
                                     position=position, colour=background_colour)
+        self._sprite = None
+        self._sprite_parameters = None
         self.reset(n_dots=n_dots, target_direction=target_direction,
                         target_dot_ratio=target_dot_ratio)
         self.set_logging(False)
 
+    @staticmethod
+    def _now():
+        """Return the current time in ms."""
+        return get_time() * 1000
+
     def reset(self, n_dots, target_direction, target_dot_ratio):
         """Reset and recreate dot pattern
 
@@ -118,17 +144,50 @@ class RandomDotKinematogram(Stimulus):
 
         """
         self.target_direction = target_direction
-        self.dots = [self._make_random_dot(direction=None) for x in range(n_dots)]
+        self._start = np.zeros((n_dots, 2))
+        self._vector = np.zeros((n_dots, 2))
+        self._direction = np.zeros(n_dots)
+        self._birth = np.zeros(n_dots)
+        self._extra_age = np.zeros(n_dots)
+        self._is_target = np.zeros(n_dots, dtype=bool)
+        self._respawn(np.ones(n_dots, dtype=bool), self._now())
         self.target_dot_ratio = target_dot_ratio
 
     def reset_all_ages(self, randomize_ages=False):
         """Reset all ages (born at current time) and randomize start age if required"""
-        map(lambda x : x.reset_age(randomize_age=randomize_ages), self.dots)
+        now = self._now()
+        self._start = self._positions(now)
+        self._birth[:] = now
+        if randomize_ages:
+            self._extra_age = np.random.random(self.n_dots) * \
+                              self.dot_lifetime
+
+    @property
+    def dots(self):
+        """Getter for the dots.
+
+        Returns a list of MovingPosition objects (copies of the current state
+        of the dots).
+
+        """
+
+        now = self._now()
+        positions = self._positions(now).tolist()
+        ages = self._ages(now).tolist()
+        directions = self._direction.tolist()
+        return [MovingPosition(position=positions[i],
+                               direction=directions[i],
+                               speed=self.dot_speed,
+                               lifetime=self.dot_lifetime,
+                               extra_age=ages[i],
+                               north_up_clockwise=self.north_up_clockwise,
+                               is_target=bool(self._is_target[i]))
+                for i in range(self.n_dots)]
 
     @property
     def n_dots(self):
         """Getter for n_dots."""
-        return len(self.dots)
+        return len(self._is_target)
 
     @property
     def logging(self):
@@ -148,12 +207,12 @@ class RandomDotKinematogram(Stimulus):
 
     @property
     def n_target_dots(self):
-        return sum([int(x.is_target) for x in self.dots])
+        return int(np.count_nonzero(self._is_target))
 
     @property
     def target_dot_ratio(self):
         """Getter for target dot ratio"""
-        return self.n_target_dots / float(len(self.dots))
+        return self.n_target_dots / float(self.n_dots)
 
     @target_dot_ratio.setter
     def target_dot_ratio(self, value):
@@ -161,49 +220,69 @@ class RandomDotKinematogram(Stimulus):
             value = 0
         if value > 1:
             value = 1
-        curr_n_targets = self.n_target_dots
-        goal_n_targets = int(len(self.dots) * value)
-        while goal_n_targets != curr_n_targets:
-            if goal_n_targets > curr_n_targets:
-                # remove non target and add target
-                for d in self.dots:
-                    if not d.is_target:
-                        self.dots.remove(d)
-                        break
-                d = self._make_random_dot(direction=self.target_direction, randomize_age=True)
-                d.is_target = True
-                self.dots.append(d)
-            elif goal_n_targets < curr_n_targets:
-                # remove a target and add non target
-                for d in self.dots:
-                    if d.is_target:
-                        self.dots.remove(d)
-                        break
-                self.dots.append(self._make_random_dot(direction=None, randomize_age=True))
-            curr_n_targets = self.n_target_dots
+        difference = int(self.n_dots * value) - self.n_target_dots
+        if difference == 0:
+            return
+        # replace non targets by targets or targets by non targets
+        candidates = np.flatnonzero(self._is_target == (difference < 0))
+        mask = np.zeros(self.n_dots, dtype=bool)
+        mask[candidates[:abs(difference)]] = True
+        self._is_target[mask] = difference > 0
+        self._respawn(mask, self._now(), randomize_age=True)
 
     @property
     def last_stimulus(self):
         """Getter for the last plotted stimulus"""
         return self._canvas
 
-    def _make_random_dot(self, direction=None, randomize_age=False):
-        """make a random dot"""
-        while (True):
-            pos = (int(self.area_radius - random.random()*2*self.area_radius),
-              int(self.area_radius - random.random()*2*self.area_radius))
-            if math.hypot(pos[0],pos[1])< self.area_radius:
-                break
-        if direction is None:
-            direction = random.random() * 360
-        rtn = MovingPosition(position=pos,
-                        direction=direction,
-                        speed = self.dot_speed,
-                        lifetime = self.dot_lifetime,
-                        north_up_clockwise=self.north_up_clockwise)
+    def _positions(self, now):
+        """Return the current positions of all dots (n, 2)."""
+        return self._start + (now - self._birth)[:, None] * self._vector
+
+    def _ages(self, now):
+        """Return the current ages of all dots (n)."""
+        return now - self._birth + self._extra_age
+
+    def _respawn(self, mask, now, randomize_age=False):
+        """Give the masked dots new random positions and directions.
+
+        Targets move in the target direction, all other dots in random
+        directions.
+
+        """
+
+        n = int(np.count_nonzero(mask))
+        if n == 0:
+            return
+        # uniformly distributed in the area
+        radius = self.area_radius * np.sqrt(np.random.random(n))
+        angle = np.random.random(n) * 2 * np.pi
+        self._start[mask, 0] = radius * np.cos(angle)
+        self._start[mask, 1] = radius * np.sin(angle)
+        direction = np.where(self._is_target[mask], self.target_direction,
+                             np.random.random(n) * 360)
+        self._direction[mask] = direction
+        if self.north_up_clockwise:
+            direction = 450 - direction
+        angle = direction * np.pi / 180.0
+        speed = self.dot_speed / 1000.0
+        self._vector[mask, 0] = speed * np.cos(angle)
+        self._vector[mask, 1] = speed * np.sin(angle)
+        self._birth[mask] = now
         if randomize_age:
-            rtn.reset_age(randomize_age=True)
-        return rtn
+            self._extra_age[mask] = np.random.random(n) * self.dot_lifetime
+        else:
+            self._extra_age[mask] = 0
+
+    def _get_sprite(self):
+        """Return the pre-rendered dot surface."""
+        parameters = (self.dot_radius, self.dot_colour)
+        if self._sprite is None or self._sprite_parameters != parameters:
+            dot = Circle(radius=self.dot_radius, colour=self.dot_colour)
+            Stimulus._id_counter -= 1
+            self._sprite = dot._get_surface()
+            self._sprite_parameters = parameters
+        return self._sprite
 
     def make_frame(self, background_stimulus=None):
         """Make new frame. The function creates the current random dot kinematogram
@@ -228,17 +307,30 @@ class RandomDotKinematogram(Stimulus):
         if background_stimulus is not None:
             background_stimulus.plot(self._canvas)
 
-        def _process_dot(d):
-            if d.is_dead or d.is_outside(self.area_radius):
-                if d.is_target:
-                    d = self._make_random_dot(direction=d.direction)
-                    d.is_target = True
-                else:
-                    d = self._make_random_dot()
-            Circle(position = d.position, radius=self.dot_radius,
-                        colour=self.dot_colour).plot(self._canvas)
-            return d
-        self.dots = list(map(_process_dot, self.dots))
+        now = self._now()
+        positions = self._positions(now)
+        dead = (self._ages(now) >= self.dot_lifetime) | \
+               (np.hypot(positions[:, 0], positions[:, 1]) >= self.area_radius)
+        if dead.any():
+            self._respawn(dead, now)
+            positions[dead] = self._start[dead]
+
+        sprite = self._get_sprite()
+        self._canvas.unload(keep_surface=True)
+        self._canvas._unshare_surface()
+        surface = self._canvas._get_surface()
+        size = surface.get_size()
+        # top left corners of the dots in surface coordinates
+        x = (positions[:, 0].astype(int) + size[0] // 2 -
+             sprite.get_width() // 2)
+        y = (- positions[:, 1].astype(int) + size[1] // 2 -
+             sprite.get_height() // 2)
+        blit_sequence = [(sprite, xy) for xy in zip(x.tolist(), y.tolist())]
+        if hasattr(surface, "blits"):
+            surface.blits(blit_sequence, doreturn=False)
+        else:
+            for s, xy in blit_sequence:
+                surface.blit(s, xy)
         return self._canvas
 
     def present_and_wait_keyboard(self, background_stimulus=None,
@@ -327,7 +419,7 @@ class MovingPosition(object):
         self.extra_age = extra_age # add extra age for shorter lifetime
         self.is_target = is_target
         self._speed = speed
-        self._north_up_clockwise = north_up_clockwise,
+        self._north_up_clockwise = north_up_clockwise
         self._direction = direction
         self._update_movement_vector()
         self._clock = Clock()
@@ -16,13 +16,17 @@ __revision__ = ''
 __date__ = ''
 
 
+import math
 import random
+from hashlib import md5
 
 import pygame
 
 from . import defaults
 from ... import _internals
 from ...stimuli._visual import Visual
+from ...stimuli._render_cache import get_render_cache
+from ...misc import geometry
 
 
 class StimulusCloud(Visual):
@@ -111,7 +115,8 @@ class StimulusCloud(Visual):
             surface.blit(stim._get_surface(), stim.rect)
         return surface
 
-    def make(self, stimuli, min_distance=None):
+    def make(self, stimuli, min_distance=None, random_seed=None,
+             placement=None, max_attempts=None):
         """Make the cloud by randomly putting stimuli on it.
 
         Notes
@@ -129,52 +134,177 @@ class StimulusCloud(Visual):
             list of stimuli to put in the cloud
         min_distance : int, optional
             minimal allowed distance between stimuli
+        random_seed : int, optional
+            seed for the random positions; clouds with a random seed can be
+            stored in the render cache (see stimuli.defaults.render_cache)
+        placement : str, optional
+            'random' (stimuli are put at random positions one after the
+            other) or 'poisson' (positions are chosen from a Poisson-disc
+            sampling of the cloud, which is fast also for dense clouds;
+            without min_distance, the stimuli are spaced by their diagonal)
+        max_attempts : int, optional
+            maximal number of random positions to try ('random' placement)
+
+        Returns
+        -------
+        success : bool
+            False if no solution could be found
 
         """
 
+        if placement is None:
+            placement = defaults.stimuluscloud_placement
+        if max_attempts is None:
+            max_attempts = defaults.stimuluscloud_max_attempts
+
         surface = pygame.surface.Surface(self.size,
                                          pygame.SRCALPHA).convert_alpha()
         surface.fill((0, 0, 0))
         self._set_surface(surface)
-        remix = 0
-        while(True): #remix-loop
+        if len(stimuli) == 0:
+            # as before, an empty cloud is no solution
             self._cloud = []
-            remix = remix + 1
+            message = "Stimuluscloud make: Cannot find a solution."
+            print(("Warning: ", message))
+            return False
+
+        cache = get_render_cache()
+        if cache is not None and random_seed is not None:
+            # placement depends on the sizes and, without min_distance, on
+            # the shapes of the stimuli
+            description = []
             for stimulus in stimuli:
-                reps = 0
                 stimulus._set_surface(stimulus._get_surface())
-                while(True): #find a solution
-                    stimulus.position = (random.randint(-self.size[0] // 2,
-                                                        self.size[0] // 2),
-                                         random.randint(-self.size[1] // 2,
-                                                        self.size[1] // 2))
-                    reps = reps + 1
-                    if stimulus.inside_stimulus(self):
-                        okay = True
-                        if min_distance is None:
-                            for s in self._cloud:
-                                if stimulus.overlapping_with_stimulus(s)[0]:
-                                    okay = False
-                                    break
-                        else:
-                            for s in self._cloud:
-                                if stimulus.distance(s) < min_distance:
-                                    okay = False
-                                    break
-                        if okay:
-                            self._cloud.append(stimulus)
-                            reps = 0
-                            if len(self._cloud) == len(stimuli):
-                                self.clear_surface()
-                                return True
+                if min_distance is None:
+                    description.append(md5(pygame.image.tostring(
+                        stimulus._get_surface(), "RGBA")).hexdigest())
+                else:
+                    description.append(tuple(stimulus.surface_size))
+            key = cache.make_key("StimulusCloud",
+                                 {"size": tuple(self.size),
+                                  "min_distance": min_distance,
+                                  "stimuli": description,
+                                  "placement": placement,
+                                  "max_attempts": max_attempts}, random_seed)
+            entry = cache.get(key)
+            if entry is not None:
+                for stimulus, position in zip(stimuli, entry[1]):
+                    stimulus.position = tuple(position)
+                self._cloud = list(stimuli)
+                self.clear_surface()
+                return True
+        else:
+            cache = None
+        if random_seed is None:
+            rnd = random
+        else:
+            rnd = random.Random(random_seed)
+        for stimulus in stimuli:
+            stimulus._set_surface(stimulus._get_surface())
+        if placement == "random":
+            positions = self._place_random(stimuli, min_distance, rnd,
+                                           max_attempts)
+        elif placement == "poisson":
+            positions = self._place_poisson(stimuli, min_distance, rnd)
+        else:
+            raise ValueError("Unknown placement: {0}".format(placement))
+        if positions is None:
+            message = "Stimuluscloud make: Cannot find a solution."
+            print(("Warning: ", message))
+            return False
+
+        for stimulus, position in zip(stimuli, positions):
+            stimulus.position = position
+        self._cloud = list(stimuli)
+        self.clear_surface()
+        if cache is not None:
+            cache.put(key, metadata=[list(s.position) for s in self._cloud])
+        return True
+
+    @staticmethod
+    def _get_rect(stimulus, distance=0):
+        """Return the bounding rectangle of a stimulus (plus distance)."""
+
+        x, y = stimulus.position
+        w, h = stimulus.surface_size
+        return (x - w / 2.0 - distance, y - h / 2.0 - distance,
+                x + w / 2.0 + distance, y + h / 2.0 + distance)
+
+    def _place_random(self, stimuli, min_distance, rnd, max_attempts):
+        """Return random positions of the stimuli (or None).
+
+        Candidates are only checked against the stimuli in neighbouring
+        cells of a spatial grid. If a stimulus can not be placed after 10000
+        attempts, the placement starts anew.
+
+        """
+
+        if min_distance is None:
+            cell_size = max(max(s.surface_size) for s in stimuli)
+        else:
+            cell_size = min_distance
+        grid = geometry.SpatialGrid(cell_size)
+        placed = []
+        positions = []
+        reps = 0
+        for _attempt in range(max_attempts):
+            stimulus = stimuli[len(placed)]
+            stimulus.position = (rnd.randint(-self.size[0] // 2,
+                                             self.size[0] // 2),
+                                 rnd.randint(-self.size[1] // 2,
+                                             self.size[1] // 2))
+            reps = reps + 1
+            if stimulus.inside_stimulus(self):
+                okay = True
+                if min_distance is None:
+                    for s in grid.query(self._get_rect(stimulus)):
+                        if stimulus.overlapping_with_stimulus(s)[0]:
+                            okay = False
                             break
-                    if reps > 10000:
+                else:
+                    for s in grid.query(self._get_rect(stimulus,
+                                                       min_distance)):
+                        if stimulus.distance(s) < min_distance:
+                            okay = False
+                            break
+                if okay:
+                    placed.append(stimulus)
+                    positions.append(tuple(stimulus.position))
+                    grid.add(stimulus, self._get_rect(stimulus))
+                    reps = 0
+                    if len(placed) == len(stimuli):
+                        return positions
+            if reps > 10000:  # remix
+                placed = []
+                positions = []
+                grid.clear()
+                reps = 0
+        return None
+
+    def _place_poisson(self, stimuli, min_distance, rnd):
+        """Return positions from a Poisson-disc sampling (or None)."""
+
+        if min_distance is None:
+            min_distance = max(math.hypot(*s.surface_size) for s in stimuli)
+        # strictly larger distance, robust against rounding to integers
+        min_distance = min_distance + 2
+        for _remix in range(10):
+            points = geometry.poisson_disc_sampling(
+                self.size, min_distance, random_seed=rnd.randrange(2 ** 31))
+            points = [(int(round(x)), int(round(y))) for x, y in points]
+            rnd.shuffle(points)
+            positions = []
+            for stimulus in stimuli:
+                while len(points) > 0:
+                    stimulus.position = points.pop()
+                    if stimulus.inside_stimulus(self):
+                        positions.append(tuple(stimulus.position))
                         break
-
-            if (remix > 10):
-                message = "Stimuluscloud make: Cannot find a solution."
-                print(("Warning: ", message))
-                return False
+                else:
+                    break
+            if len(positions) == len(stimuli):
+                return positions
+        return None
 
     def shuffel_surface_sequence(self, from_idx=0, to_idx= -1):
         """Shuffle the surfaces sequence.
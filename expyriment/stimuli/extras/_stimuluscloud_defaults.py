@@ -5,3 +5,5 @@ stimuluscloud_position = (0, 0)
 stimuluscloud_rotation = None
 stimuluscloud_scaling = None
 stimuluscloud_flipping = None
+stimuluscloud_placement = "random" # 'random' or 'poisson'
+stimuluscloud_max_attempts = 100000
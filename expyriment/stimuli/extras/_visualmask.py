@@ -16,11 +16,13 @@ __revision__ = ''
 __date__ = ''
 
 
-from random import shuffle
+import random
 import tempfile
 import os
 from types import ModuleType
 
+import pygame
+
 try:
     from PIL import Image, ImageDraw, ImageFilter #import PIL
 except:
@@ -29,6 +31,7 @@ except:
 from ... import _internals, stimuli
 from ...misc._timer import get_time
 from ...stimuli._picture import Picture
+from ...stimuli._render_cache import get_render_cache
 from . import defaults
 
 
@@ -37,7 +40,7 @@ class VisualMask(Picture):
 
     def __init__(self, size, position=None, dot_size=None,
                  background_colour=None, dot_colour=None,
-                 dot_percentage=None, smoothing=None):
+                 dot_percentage=None, smoothing=None, random_seed=None):
         """Create a visual mask.
 
         Parameters
@@ -54,6 +57,10 @@ class VisualMask(Picture):
             percentage of covered area by the dots (1 to 100)
         smoothing : int, optional
             smoothing (default=3)
+        random_seed : int, optional
+            seed for the random arrangement of the dots; masks with a random
+            seed can be stored in the render cache
+            (see stimuli.defaults.render_cache)
 
         """
 
@@ -67,6 +74,8 @@ The Python package 'Python Imaging Library (PIL)' is not installed."""
                     suffix=".png")
         os.close(fid)
         Picture.__init__(self, filename, position)
+        self._mask_surface = None
+        self._mask_saved = False
 
         self._size = size
         if dot_size is not None:
@@ -93,6 +102,7 @@ The Python package 'Python Imaging Library (PIL)' is not installed."""
             self.smoothing = smoothing
         else:
             self.smoothing = defaults.visualmask_smoothing
+        self.random_seed = random_seed
 
         self.create_mask()
 
@@ -116,6 +126,25 @@ The Python package 'Python Imaging Library (PIL)' is not installed."""
         if was_preloaded:
             self.unload()
 
+        cache = get_render_cache()
+        if cache is not None and self.random_seed is not None:
+            key = cache.make_key(
+                "VisualMask",
+                {"size": tuple(self._size), "dot_size": tuple(self.dot_size),
+                 "background_colour": tuple(self.background_colour),
+                 "dot_colour": tuple(self.dot_colour),
+                 "dot_percentage": self.dot_percentage,
+                 "smoothing": self.smoothing}, self.random_seed)
+            entry = cache.get(key)
+            if entry is not None:
+                self._mask_surface = entry[0]
+                self._mask_saved = False
+                if was_preloaded:
+                    self.preload()
+                return int((get_time() - start) * 1000)
+        else:
+            cache = None
+
         s = (self._size[0] + 4 * self.smoothing,
              self._size[1] + 4 * self.smoothing) #somewhat larger mask 
         im = Image.new("RGB", s)
@@ -126,7 +155,10 @@ The Python package 'Python Imaging Library (PIL)' is not installed."""
         n_dots_x = int(s[0] / self.dot_size[0]) + 1
         n_dots_y = int(s[1] / self.dot_size[1]) + 1
         dots = list(range(n_dots_x * n_dots_y))
-        shuffle(dots)
+        if self.random_seed is None:
+            random.shuffle(dots)
+        else:
+            random.Random(self.random_seed).shuffle(dots)
         for d in dots[:int(len(dots) * self.dot_percentage / 100)]:
             y = (d // n_dots_x) * self.dot_size[1]
             x = (d % n_dots_x) * self.dot_size[0]
@@ -137,17 +169,53 @@ The Python package 'Python Imaging Library (PIL)' is not installed."""
         for x in range(self.smoothing):
             im = im.filter(ImageFilter.BLUR).filter(ImageFilter.SMOOTH_MORE)
 
-        #crop image and save
+        #crop image
         c = (im.size[0] // 2, im.size[1] // 2)
         box = (c[0] - self._size[0] // 2, c[1] - self._size[1] // 2,
                c[0] + self._size[0] // 2, c[1] + self._size[1] // 2)
         im = im.crop(box)
-        im.save(self._filename, format="png")
+        self._mask_surface = pygame.image.fromstring(
+            im.convert("RGBA").tobytes(), im.size, "RGBA")
+        self._mask_saved = False
+        if cache is not None:
+            cache.put(key, self._mask_surface)
 
         if was_preloaded:
             self.preload()
         return int((get_time() - start) * 1000)
 
+    @Picture.filename.getter
+    def filename(self):
+        """Getter for filename.
+
+        The mask is only saved to the (temporary) file when its name is
+        requested.
+
+        """
+
+        if self._mask_surface is not None and not self._mask_saved:
+            pygame.image.save(self._mask_surface, self._filename)
+            self._mask_saved = True
+        return self._filename
+
+    @filename.setter
+    def filename(self, value):
+        """Setter for filename."""
+
+        Picture.filename.fset(self, value)
+        self._mask_surface = None
+
+    def _create_surface(self):
+        """Create the surface of the stimulus."""
+
+        if self._mask_surface is None:
+            return Picture._create_surface(self)
+        surface = self._mask_surface.copy()
+        if pygame.display.get_init() and \
+                pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        return surface
+
 
 if __name__ == "__main__":
     from ... import control